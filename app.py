@@ -13,7 +13,6 @@ from typing import Optional, List, Dict, Any
 import random
 import json
 import logging
-import os
 from utils import generate_link
 from email_template_engine import EmailTemplateEngine
 from email_batch_manager import EmailBatchManager
@@ -68,6 +67,8 @@ from email_scheduler_optimized import (
 from contact_rule_engine import ContactRuleEngine
 from email_scheduler_common import (
     ALL_STATES,
+    ALL_STATE_SET,
+    build_date_strings,
 )
 
 # Import our database and formatting functions
@@ -783,10 +784,38 @@ email_scheduler = EmailScheduler()
 SPECIAL_RULE_STATES = sorted(rule_engine.get_special_rule_states())
 
 # Get state rules
-BIRTHDAY_RULE_STATES = {state: rule_engine.get_state_rule(state) for state in rule_engine.state_rules if rule_engine.get_state_rule(state).get('type') == 'birthday'}
-EFFECTIVE_DATE_RULE_STATES = {state: rule_engine.get_state_rule(state) for state in rule_engine.state_rules if rule_engine.get_state_rule(state).get('type') == 'effective_date'}
+BIRTHDAY_RULE_STATES = {state: rule for state, rule in rule_engine.state_rules.items() if rule.get('type') == 'birthday'}
+EFFECTIVE_DATE_RULE_STATES = {state: rule for state, rule in rule_engine.state_rules.items() if rule.get('type') == 'effective_date'}
 YEAR_ROUND_ENROLLMENT_STATES = [state for state in rule_engine.state_rules if rule_engine.is_year_round_enrollment_state(state)]
 
+# Frozen copies for O(1) membership tests; the ordered lists above are what templates iterate
+SPECIAL_RULE_STATE_SET = frozenset(SPECIAL_RULE_STATES)
+YEAR_ROUND_ENROLLMENT_STATE_SET = frozenset(YEAR_ROUND_ENROLLMENT_STATES)
+
+def _build_scheduling_rules(state: str) -> List[str]:
+    """Human-readable scheduling rules shown for contacts in a state"""
+    rules = []
+    window = BIRTHDAY_RULE_STATES.get(state)
+    if window is not None:
+        rules.append(f"Birthday emails: {window.get('window_before', 0)} days before to {window.get('window_after', 0)} days after birthday")
+    window = EFFECTIVE_DATE_RULE_STATES.get(state)
+    if window is not None:
+        rules.append(f"Effective date emails: {window.get('window_before', 0)} days before to {window.get('window_after', 0)} days after anniversary")
+    if state in YEAR_ROUND_ENROLLMENT_STATE_SET:
+        rules.append("Year-round enrollment state - no scheduled emails")
+    else:
+        rules.append("AEP emails: Distributed across August/September")
+        rules.append("Post-window emails: Day after exclusion period")
+    return rules
+
+# Scheduling rules only depend on the state, so format them once per state instead of per contact
+SCHEDULING_RULES_BY_STATE = {state: _build_scheduling_rules(state) for state in ALL_STATES}
+
+def get_scheduling_rules(state: str) -> List[str]:
+    """Scheduling rules for a state, as a fresh list the caller may keep"""
+    rules = SCHEDULING_RULES_BY_STATE.get(state)
+    return list(rules) if rules is not None else _build_scheduling_rules(state)
+
 def get_all_occurrences(base_date: date, start_date: date, end_date: date) -> List[date]:
     """
     Get all yearly occurrences of a date between start_date and end_date
@@ -915,7 +944,7 @@ async def home(request: Request):
                 state: {
                     "has_birthday_rule": state in BIRTHDAY_RULE_STATES,
                     "has_effective_date_rule": state in EFFECTIVE_DATE_RULE_STATES,
-                    "has_year_round_enrollment": state in YEAR_ROUND_ENROLLMENT_STATES
+                    "has_year_round_enrollment": state in YEAR_ROUND_ENROLLMENT_STATE_SET
                 }
                 for state in ALL_STATES
             }
@@ -933,7 +962,7 @@ async def dashboard(request: Request):
         "post_window": 0,
         "total": 0,
         "skipped": 0,
-        "has_special_rule": state in SPECIAL_RULE_STATES
+        "has_special_rule": state in SPECIAL_RULE_STATE_SET
     } for state in ALL_STATES}
     
     # Placeholder data - in a real app, this would come from database
@@ -944,8 +973,8 @@ async def dashboard(request: Request):
     for state in SPECIAL_RULE_STATES:
         email_counts_by_state[state]["birthday"] = random.randint(10, 50)
         email_counts_by_state[state]["effective_date"] = random.randint(5, 40)
-        email_counts_by_state[state]["aep"] = random.randint(0, 30) if state not in YEAR_ROUND_ENROLLMENT_STATES else 0
-        email_counts_by_state[state]["post_window"] = random.randint(0, 20) if state not in YEAR_ROUND_ENROLLMENT_STATES else 0
+        email_counts_by_state[state]["aep"] = random.randint(0, 30) if state not in YEAR_ROUND_ENROLLMENT_STATE_SET else 0
+        email_counts_by_state[state]["post_window"] = random.randint(0, 20) if state not in YEAR_ROUND_ENROLLMENT_STATE_SET else 0
         email_counts_by_state[state]["skipped"] = random.randint(1, 10)
         email_counts_by_state[state]["total"] = (
             email_counts_by_state[state]["birthday"] + 
@@ -958,7 +987,7 @@ async def dashboard(request: Request):
         total_skipped += email_counts_by_state[state]["skipped"]
     
     # Add some data for non-special states
-    for i, state in enumerate(list(set(ALL_STATES) - set(SPECIAL_RULE_STATES))):
+    for i, state in enumerate(ALL_STATE_SET - SPECIAL_RULE_STATE_SET):
         if i < 10:  # Only populate some non-special states
             email_counts_by_state[state]["birthday"] = random.randint(5, 30)
             email_counts_by_state[state]["effective_date"] = random.randint(3, 25)
@@ -1105,7 +1134,7 @@ async def simulate_emails(data: SimulationRequest):
         email_list = []
         
         # Add scheduled emails
-        for email in result.get("scheduled", []):
+        for email in result["scheduled"]:
             try:
                 email_date = email.get('scheduled_date') or email.get('date')
                 if not email_date:
@@ -1143,7 +1172,7 @@ async def simulate_emails(data: SimulationRequest):
                 continue
             
         # Add skipped emails
-        for email in result.get("skipped", []):
+        for email in result["skipped"]:
             try:
                 email_date = email.get('scheduled_date') or email.get('date')
                 if not email_date:
@@ -1184,18 +1213,7 @@ async def simulate_emails(data: SimulationRequest):
         email_list.sort(key=lambda x: x['start'])
         
         # Get state rules
-        rules = []
-        if data.state in BIRTHDAY_RULE_STATES:
-            window = BIRTHDAY_RULE_STATES[data.state]
-            rules.append(f"Birthday emails: {window.get('window_before', 0)} days before to {window.get('window_after', 0)} days after birthday")
-        if data.state in EFFECTIVE_DATE_RULE_STATES:
-            window = EFFECTIVE_DATE_RULE_STATES[data.state]
-            rules.append(f"Effective date emails: {window.get('window_before', 0)} days before to {window.get('window_after', 0)} days after anniversary")
-        if data.state in YEAR_ROUND_ENROLLMENT_STATES:
-            rules.append("Year-round enrollment state - no scheduled emails")
-        else:
-            rules.append("AEP emails: Distributed across August/September")
-            rules.append("Post-window emails: Day after exclusion period")
+        rules = get_scheduling_rules(data.state)
         
         response = {
             "contact_info": {
@@ -1214,7 +1232,7 @@ async def simulate_emails(data: SimulationRequest):
                 "code": data.state,
                 "has_birthday_rule": data.state in BIRTHDAY_RULE_STATES,
                 "has_effective_date_rule": data.state in EFFECTIVE_DATE_RULE_STATES,
-                "has_year_round_enrollment": data.state in YEAR_ROUND_ENROLLMENT_STATES
+                "has_year_round_enrollment": data.state in YEAR_ROUND_ENROLLMENT_STATE_SET
             }
         }
         
@@ -1315,7 +1333,7 @@ async def resample_contacts(
                     "code": state_code,
                     "has_birthday_rule": state_code in BIRTHDAY_RULE_STATES,
                     "has_effective_date_rule": state_code in EFFECTIVE_DATE_RULE_STATES,
-                    "has_year_round_enrollment": state_code in YEAR_ROUND_ENROLLMENT_STATES,
+                    "has_year_round_enrollment": state_code in YEAR_ROUND_ENROLLMENT_STATE_SET,
                     "rule_details": {
                         "birthday": BIRTHDAY_RULE_STATES.get(state_code, {}),
                         "effective_date": EFFECTIVE_DATE_RULE_STATES.get(state_code, {})
@@ -1367,19 +1385,7 @@ async def resample_contacts(
                 }
                 
                 # Add applicable scheduling rules based on state
-                rules = []
-                if state_info['has_birthday_rule']:
-                    window = BIRTHDAY_RULE_STATES.get(state_code, {})
-                    rules.append(f"Birthday emails: {window.get('window_before', 0)} days before to {window.get('window_after', 0)} days after birthday")
-                if state_info['has_effective_date_rule']:
-                    window = EFFECTIVE_DATE_RULE_STATES.get(state_code, {})
-                    rules.append(f"Effective date emails: {window.get('window_before', 0)} days before to {window.get('window_after', 0)} days after anniversary")
-                if state_info['has_year_round_enrollment']:
-                    rules.append("Year-round enrollment state - no scheduled emails")
-                else:
-                    rules.append("AEP emails: Distributed across August/September")
-                    rules.append("Post-window emails: Day after exclusion period")
-                contacts_data[contact_id]['scheduling_rules'] = rules
+                contacts_data[contact_id]['scheduling_rules'] = get_scheduling_rules(state_code)
 
         logger.debug("Processed %d contacts into contacts_data", len(contacts_data))
         
@@ -1652,12 +1658,18 @@ async def check_schedules(
 
         # Convert results to DataFrame for easier filtering and organization
         df_data = []
+        # Index contacts once instead of scanning the list for every result; the first
+        # contact with a given ID wins, matching the previous linear search
+        contacts_by_id = {}
+        for c in current_contacts:
+            contacts_by_id.setdefault(c['id'], c)
+        date_strings = build_date_strings(current_date, end_date)
         for result in results:
             contact_id = result['contact_id']
-            contact = next((c for c in current_contacts if c['id'] == contact_id), None)
+            contact = contacts_by_id.get(contact_id)
             if contact:
                 # Add scheduled emails
-                for email in result.get('scheduled', []):
+                for email in result['scheduled']:
                     df_data.append({
                         'contact_id': contact_id,
                         'first_name': contact.get('first_name', ''),
@@ -1670,11 +1682,11 @@ async def check_schedules(
                         'email_date': email['date'],
                         'skipped': 'No',
                         'reason': '',
-                        'link': f"/contact/{contact_id}/email/{email['type']}/{email['date']}"
+                        'link': f"/contact/{contact_id}/email/{email['type']}/{date_strings.get(email['date'], email['date'])}"
                     })
                 
                 # Add skipped emails
-                for email in result.get('skipped', []):
+                for email in result['skipped']:
                     df_data.append({
                         'contact_id': contact_id,
                         'first_name': contact.get('first_name', ''),
@@ -1736,19 +1748,7 @@ async def check_schedules(
             }
 
             # Add applicable scheduling rules based on state
-            rules = []
-            if state_code in BIRTHDAY_RULE_STATES:
-                window = BIRTHDAY_RULE_STATES[state_code]
-                rules.append(f"Birthday emails: {window.get('window_before', 0)} days before to {window.get('window_after', 0)} days after birthday")
-            if state_code in EFFECTIVE_DATE_RULE_STATES:
-                window = EFFECTIVE_DATE_RULE_STATES[state_code]
-                rules.append(f"Effective date emails: {window.get('window_before', 0)} days before to {window.get('window_after', 0)} days after anniversary")
-            if state_code in YEAR_ROUND_ENROLLMENT_STATES:
-                rules.append("Year-round enrollment state - no scheduled emails")
-            else:
-                rules.append("AEP emails: Distributed across August/September")
-                rules.append("Post-window emails: Day after exclusion period")
-            contacts_data[contact_id]['scheduling_rules'] = rules
+            contacts_data[contact_id]['scheduling_rules'] = get_scheduling_rules(state_code)
 
             # Add emails to timeline data
             email_list = []
@@ -1939,12 +1939,18 @@ async def process_universe(
         
         # Convert results to DataFrame for easier filtering and organization
         df_data = []
+        # Index contacts once instead of scanning the list for every result; the first
+        # contact with a given ID wins, matching the previous linear search
+        contacts_by_id = {}
+        for c in selected_contacts:
+            contacts_by_id.setdefault(c['id'], c)
+        date_strings = build_date_strings(start, end)
         for result in results:
             contact_id = result['contact_id']
-            contact = next((c for c in selected_contacts if c['id'] == contact_id), None)
+            contact = contacts_by_id.get(contact_id)
             if contact:
                 # Add scheduled emails
-                for email in result.get('scheduled', []):
+                for email in result['scheduled']:
                     df_data.append({
                         'contact_id': contact_id,
                         'first_name': contact.get('first_name', ''),
@@ -1957,11 +1963,11 @@ async def process_universe(
                         'email_date': email['date'],
                         'skipped': 'No',
                         'reason': '',
-                        'link': f"/contact/{contact_id}/email/{email['type']}/{email['date']}"
+                        'link': f"/contact/{contact_id}/email/{email['type']}/{date_strings.get(email['date'], email['date'])}"
                     })
                 
                 # Add skipped emails
-                for email in result.get('skipped', []):
+                for email in result['skipped']:
                     df_data.append({
                         'contact_id': contact_id,
                         'first_name': contact.get('first_name', ''),
@@ -2007,19 +2013,7 @@ async def process_universe(
             }
 
             # Add applicable scheduling rules based on state
-            rules = []
-            if state_code in BIRTHDAY_RULE_STATES:
-                window = BIRTHDAY_RULE_STATES[state_code]
-                rules.append(f"Birthday emails: {window.get('window_before', 0)} days before to {window.get('window_after', 0)} days after birthday")
-            if state_code in EFFECTIVE_DATE_RULE_STATES:
-                window = EFFECTIVE_DATE_RULE_STATES[state_code]
-                rules.append(f"Effective date emails: {window.get('window_before', 0)} days before to {window.get('window_after', 0)} days after anniversary")
-            if state_code in YEAR_ROUND_ENROLLMENT_STATES:
-                rules.append("Year-round enrollment state - no scheduled emails")
-            else:
-                rules.append("AEP emails: Distributed across August/September")
-                rules.append("Post-window emails: Day after exclusion period")
-            contacts_data[contact_id]['scheduling_rules'] = rules
+            contacts_data[contact_id]['scheduling_rules'] = get_scheduling_rules(state_code)
 
             # Add emails to timeline data
             email_list = []
@@ -2103,7 +2097,7 @@ async def universe_selection(request: Request):
                 state: {
                     "has_birthday_rule": state in BIRTHDAY_RULE_STATES,
                     "has_effective_date_rule": state in EFFECTIVE_DATE_RULE_STATES,
-                    "has_year_round_enrollment": state in YEAR_ROUND_ENROLLMENT_STATES
+                    "has_year_round_enrollment": state in YEAR_ROUND_ENROLLMENT_STATE_SET
                 }
                 for state in ALL_STATES
             },
@@ -1,18 +1,139 @@
 import yaml
-from datetime import date, datetime, timedelta
+from bisect import bisect_left
+from datetime import date, timedelta
+from functools import lru_cache
+from operator import itemgetter
 from typing import Dict, Any, List, Optional, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on cached exclusion-window results per engine
+EXCLUSION_WINDOW_CACHE_SIZE = 65536
+
+# Upper bound on cached anniversary email tables (one per month/day, offset and date range)
+ANNIVERSARY_CACHE_SIZE = 8192
+
+# Days elapsed before the first of each month in a non-leap year (index 1-12)
+CUMULATIVE_MONTH_DAYS = (0, 0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334)
+
+def anniversary_ordinals(month: int, day: int, first_year: int, last_year: int) -> List[int]:
+    """
+    Proleptic Gregorian ordinals of month/day for each year in [first_year, last_year],
+    computed with integer arithmetic instead of building date objects.
+    February 29 falls back to February 28 in non-leap years.
+    """
+    ordinals = []
+    for year in range(first_year, last_year + 1):
+        y = year - 1
+        ordinal = y * 365 + y // 4 - y // 100 + y // 400 + CUMULATIVE_MONTH_DAYS[month] + day
+        is_leap = year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+        if month > 2 and is_leap:
+            ordinal += 1
+        elif month == 2 and day == 29 and not is_leap:
+            ordinal -= 1
+        ordinals.append(ordinal)
+    return ordinals
+
+@lru_cache(maxsize=ANNIVERSARY_CACHE_SIZE)
+def anniversary_email_dates(month: int, day: int, days_before: int, current_date: date,
+                            end_date: date) -> Tuple[date, ...]:
+    """
+    Dates of an email days_before each yearly anniversary of month/day that fall
+    between current_date and end_date. Only depends on month/day, so results are
+    shared by every contact with that date.
+    """
+    current_ord = current_date.toordinal()
+    end_ord = end_date.toordinal()
+    
+    # If this year's anniversary has already passed, so has its email date.
+    # Month/day are compared as single integers (e.g. March 5 -> 305)
+    first_year = current_date.year
+    if month * 100 + day < current_date.month * 100 + current_date.day:
+        first_year += 1
+    
+    emails = []
+    for yearly_ord in anniversary_ordinals(month, day, first_year, end_date.year):
+        email_ord = yearly_ord - days_before
+        
+        if current_ord <= email_ord <= end_ord:
+            emails.append(date.fromordinal(email_ord))
+    return tuple(emails)
+
+def parse_ymd(date_str: str) -> date:
+    """
+    Parse a YYYY-MM-DD string from its integer parts, without strptime.
+    Raises ValueError for malformed strings and impossible dates, as strptime would.
+    """
+    year, month, day = date_str.split('-')
+    return date(int(year), int(month), int(day))
+
+def merge_sorted_windows(windows: List[Tuple[Any, Any]]) -> List[Tuple[Any, Any]]:
+    """
+    Merge overlapping (start, end) windows, already sorted by start, into a list of
+    disjoint windows. Works on dates or day ordinals alike.
+    """
+    merged = []
+    # Track the open window's start and running maximum end in locals rather than
+    # re-reading and rebuilding merged[-1] for every overlap
+    open_start = open_end = None
+    for start, end in windows:
+        if open_end is not None and start <= open_end:
+            if end > open_end:
+                open_end = end
+        else:
+            if open_end is not None:
+                merged.append((open_start, open_end))
+            open_start, open_end = start, end
+    if open_end is not None:
+        merged.append((open_start, open_end))
+    return merged
+
+def merge_date_windows(windows: List[Tuple[Any, Any]]) -> List[Tuple[Any, Any]]:
+    """Merge overlapping (start, end) windows into a sorted list of disjoint windows"""
+    return merge_sorted_windows(sorted(windows))
+
 class ContactRuleEngine:
-    def __init__(self, config_file: str = 'contact_rules_config.yaml'):
-        """Initialize the rule engine with configuration"""
-        with open(config_file, 'r') as f:
-            self.config = yaml.safe_load(f)
+    def __init__(self, config_file: str = 'contact_rules_config.yaml',
+                 config: Optional[Dict[str, Any]] = None):
+        """Initialize the rule engine from config_file, or from an already loaded config"""
+        if config is None:
+            with open(config_file, 'r') as f:
+                config = yaml.safe_load(f)
+        self.config = config
         self.state_rules = self.config.get('state_rules', {})
         self.timing_constants = self.config.get('timing_constants', {})
+        # Timing constants are read for every contact; resolve their defaults once
+        self.birthday_days_before = self.timing_constants.get('birthday_email_days_before', 14)
+        self.effective_date_days_before = self.timing_constants.get('effective_date_days_before', 30)
+        self.pre_window_exclusion_days = self.timing_constants.get('pre_window_exclusion_days', 60)
         self.aep_config = self.config.get('aep_config', {})
+        # AEP dates depend only on the year; build each configured year's sorted
+        # list once so scheduling can index it per contact
+        self.aep_dates_by_year = {
+            year: tuple(sorted(date(year, date_config['month'], date_config['day'])
+                               for date_config in self.aep_config.get('default_dates', [])))
+            for year in self.aep_config.get('years', [])
+        }
+        self.year_round_states = frozenset(
+            state for state, rule in self.state_rules.items() if rule.get('type') == 'year_round'
+        )
+        # Contact field each birthday/effective-date rule state anchors its exclusion window on
+        self.exclusion_base_fields = {
+            state: 'birth_date' if rule['type'] == 'birthday' else 'effective_date'
+            for state, rule in self.state_rules.items()
+            if rule.get('type') in ('birthday', 'effective_date')
+        }
+        # Exclusion window reach (days before, days after the yearly base date) per rule
+        # state, so building a window set needs one lookup instead of three
+        self.exclusion_window_offsets = {
+            state: (self.pre_window_exclusion_days + self.state_rules[state].get('window_before', 0),
+                    self.state_rules[state].get('window_after', 0))
+            for state in self.exclusion_base_fields
+        }
+        # Contacts in one org share states and dates heavily, and a run uses one
+        # current/end date pair, so exclusion windows repeat across contacts
+        self._exclusion_windows = lru_cache(maxsize=EXCLUSION_WINDOW_CACHE_SIZE)(self._compute_exclusion_windows)
 
     def get_state_rule(self, state: str) -> Dict[str, Any]:
         """Get rules for a specific state"""
@@ -20,18 +141,11 @@ class ContactRuleEngine:
 
     def is_year_round_enrollment_state(self, state: str) -> bool:
         """Check if a state has year-round enrollment"""
-        state_rule = self.get_state_rule(state)
-        return state_rule.get('type') == 'year_round'
+        return state in self.year_round_states
 
     def get_aep_dates(self, year: int) -> List[date]:
         """Get AEP dates for a specific year"""
-        if year not in self.aep_config.get('years', []):
-            return []
-        
-        dates = []
-        for date_config in self.aep_config.get('default_dates', []):
-            dates.append(date(year, date_config['month'], date_config['day']))
-        return sorted(dates)
+        return list(self.aep_dates_by_year.get(year, ()))
 
     def handle_leap_year_date(self, target_date: date, target_year: int) -> date:
         """Handle leap year date adjustments"""
@@ -47,7 +161,7 @@ class ContactRuleEngine:
 
     def calculate_exclusion_window(self, base_date: date, state_rule: Dict[str, Any]) -> Tuple[date, date]:
         """Calculate exclusion window based on state rule"""
-        pre_window_days = self.timing_constants.get('pre_window_exclusion_days', 60)
+        pre_window_days = self.pre_window_exclusion_days
         window_before = state_rule.get('window_before', 0)
         window_after = state_rule.get('window_after', 0)
         
@@ -56,6 +170,62 @@ class ContactRuleEngine:
         
         return window_start, window_end
 
+    def _anniversary_email_dates(self, raw_date: str, days_before: int, current_date: date,
+                                 end_date: date) -> Tuple[date, ...]:
+        """
+        Dates of an email days_before each yearly anniversary of raw_date (YYYY-MM-DD)
+        that fall between current_date and end_date. Shared by the birthday and
+        effective date paths.
+        """
+        base_date = parse_ymd(raw_date)
+        return anniversary_email_dates(base_date.month, base_date.day, days_before, current_date, end_date)
+
+    def _compute_exclusion_windows(self, state: str, base_date_str: str, current_date: date,
+                                   end_date: date) -> Tuple[Tuple[Tuple[date, date], ...], Tuple[date, ...], Tuple[date, ...]]:
+        """
+        Merged exclusion windows for a state and base date (YYYY-MM-DD) that overlap
+        [current_date, end_date], their end dates for bisecting, and the post-window
+        email dates that fall in range. Cached per engine as self._exclusion_windows.
+        """
+        if not base_date_str:
+            return (), (), ()
+        
+        base_date = parse_ymd(base_date_str)
+        
+        # Same windows as calculate_exclusion_window around each yearly base date
+        # (handle_leap_year_date semantics), worked out in integer day ordinals so
+        # date objects are only built for the windows that are kept
+        days_before, days_after = self.exclusion_window_offsets.get(state, (self.pre_window_exclusion_days, 0))
+        current_ord = current_date.toordinal()
+        end_ord = end_date.toordinal()
+        exclusion_windows = []
+        
+        for yearly_ord in anniversary_ordinals(base_date.month, base_date.day, current_date.year, end_date.year):
+            window_start_ord = yearly_ord - days_before
+            window_end_ord = yearly_ord + days_after
+            
+            # Only include windows that overlap with our date range
+            if window_end_ord >= current_ord and window_start_ord <= end_ord:
+                exclusion_windows.append((window_start_ord, window_end_ord))
+        
+        # Overlapping windows would be checked twice; collapse them first. Yearly base
+        # dates ascend and every window has the same offsets, so they are already sorted
+        merged_ords = merge_sorted_windows(exclusion_windows)
+        merged = tuple((date.fromordinal(start), date.fromordinal(end)) for start, end in merged_ords)
+        window_ends = tuple(window_end for _, window_end in merged)
+        
+        # Post-window emails go out the day after each window. Merged windows are sorted
+        # and disjoint, so the dates are already unique and ascending, and we can stop
+        # past end_date. Every kept window ends on or after current_date, so no lower bound check.
+        post_window_dates = []
+        for _, window_end_ord in merged_ords:
+            post_window_ord = window_end_ord + 1
+            if post_window_ord > end_ord:
+                break
+            post_window_dates.append(date.fromordinal(post_window_ord))
+        
+        return merged, window_ends, tuple(post_window_dates)
+
     def calculate_email_dates(self, contact: Dict[str, Any], current_date: date, end_date: date, 
                             total_contacts: int = 1, contact_index: int = 0) -> Dict[str, List[Dict[str, Any]]]:
         """
@@ -67,53 +237,31 @@ class ContactRuleEngine:
             'skipped': []
         }
 
-        # Skip everything for year-round enrollment states
+        # Skip everything for year-round enrollment states before doing any date work
         state = contact.get('state', '')
-        if self.is_year_round_enrollment_state(state):
+        if state in self.year_round_states:
             return result
 
-        state_rule = self.get_state_rule(state)
-        rule_type = state_rule.get('type')
-
-        # Calculate base dates first
-        emails_to_schedule = []
+        # Read each base date once; they are reused for the exclusion windows below
+        birth_date = contact.get('birth_date')
+        effective_date = contact.get('effective_date')
         
         # 1. Birthday emails
-        if contact.get('birth_date'):
-            birth_date = datetime.strptime(contact['birth_date'], '%Y-%m-%d').date()
-            days_before = self.timing_constants.get('birthday_email_days_before', 14)
-            
-            # Calculate for current and next year
-            for year in range(current_date.year, end_date.year + 1):
-                yearly_birth_date = self.handle_leap_year_date(birth_date, year)
-                email_date = yearly_birth_date - timedelta(days=days_before)
-                
-                if current_date <= email_date <= end_date:
-                    emails_to_schedule.append({
-                        'type': 'birthday',
-                        'date': email_date,
-                        'base_date': yearly_birth_date
-                    })
+        birthday_dates = ()
+        if birth_date:
+            birthday_dates = self._anniversary_email_dates(birth_date, self.birthday_days_before,
+                                                           current_date, end_date)
 
         # 2. Effective date emails
-        if contact.get('effective_date'):
-            eff_date = datetime.strptime(contact['effective_date'], '%Y-%m-%d').date()
-            days_before = self.timing_constants.get('effective_date_days_before', 30)
-            
-            for year in range(current_date.year, end_date.year + 1):
-                yearly_eff_date = date(year, eff_date.month, eff_date.day)
-                email_date = yearly_eff_date - timedelta(days=days_before)
-                
-                if current_date <= email_date <= end_date:
-                    emails_to_schedule.append({
-                        'type': 'effective_date',
-                        'date': email_date,
-                        'base_date': yearly_eff_date
-                    })
+        effective_dates = ()
+        if effective_date:
+            effective_dates = self._anniversary_email_dates(effective_date, self.effective_date_days_before,
+                                                            current_date, end_date)
 
         # 3. AEP emails
+        aep_email_dates = []
         for year in range(current_date.year, end_date.year + 1):
-            aep_dates = self.get_aep_dates(year)
+            aep_dates = self.aep_dates_by_year.get(year)
             if aep_dates:
                 # Distribute contacts evenly across AEP dates if batching
                 if total_contacts > 1:
@@ -123,67 +271,59 @@ class ContactRuleEngine:
                 
                 aep_date = aep_dates[aep_index]
                 if current_date <= aep_date <= end_date:
-                    emails_to_schedule.append({
-                        'type': 'aep',
-                        'date': aep_date,
-                        'base_date': aep_date
-                    })
+                    aep_email_dates.append(aep_date)
+
+        scheduled = result['scheduled']
+        skipped = result['skipped']
 
-        # Apply state rules and exclusions
-        if rule_type in ('birthday', 'effective_date'):
+        # Apply state rules and exclusions; one lookup tells us whether the state has
+        # a birthday/effective-date rule and which date its windows are based on.
+        # States without one have no windows, so every email is scheduled
+        exclusion_windows = window_ends = ()
+        base_date_type = self.exclusion_base_fields.get(state)
+        if base_date_type is not None:
             # Calculate exclusion windows
-            exclusion_windows = []
-            base_date_type = 'birth_date' if rule_type == 'birthday' else 'effective_date'
+            base_date_str = birth_date if base_date_type == 'birth_date' else effective_date
+            exclusion_windows, window_ends, post_window_dates = self._exclusion_windows(
+                state, base_date_str or '', current_date, end_date
+            )
             
-            if contact.get(base_date_type):
-                base_date = datetime.strptime(contact[base_date_type], '%Y-%m-%d').date()
-                
-                for year in range(current_date.year, end_date.year + 1):
-                    yearly_base_date = self.handle_leap_year_date(base_date, year)
-                    window_start, window_end = self.calculate_exclusion_window(yearly_base_date, state_rule)
-                    
-                    # Only include windows that overlap with our date range
-                    if window_end >= current_date and window_start <= end_date:
-                        exclusion_windows.append((window_start, window_end))
-                        
-                        # Add post-window email
-                        post_window_date = window_end + timedelta(days=1)
-                        if current_date <= post_window_date <= end_date:
-                            result['scheduled'].append({
-                                'type': 'post_window',
-                                'date': post_window_date
-                            })
-
-            # Check each email against exclusion windows
-            for email in emails_to_schedule:
-                email_date = email['date']
-                is_excluded = False
-                
-                for window_start, window_end in exclusion_windows:
-                    if window_start <= email_date <= window_end:
-                        is_excluded = True
-                        result['skipped'].append({
-                            'type': email['type'],
-                            'date': email_date,
-                            'reason': 'In exclusion window'
-                        })
-                        break
+            # Add post-window emails, computed once per cached window set
+            for post_window_date in post_window_dates:
+                scheduled.append({
+                    'type': 'post_window',
+                    'date': post_window_date
+                })
+        
+        # Classify every candidate email in one pass, building its result entry
+        # directly. Check each against exclusion windows: binary-search the first
+        # window ending on or after the email date, then test its start. With no
+        # windows (e.g. a missing base date) nothing can be excluded
+        window_count = len(exclusion_windows)
+        for email_type, email_dates in (('birthday', birthday_dates),
+                                        ('effective_date', effective_dates),
+                                        ('aep', aep_email_dates)):
+            for email_date in email_dates:
+                if window_count:
+                    i = bisect_left(window_ends, email_date)
+                    is_excluded = i < window_count and exclusion_windows[i][0] <= email_date
+                else:
+                    is_excluded = False
                 
-                if not is_excluded:
-                    result['scheduled'].append({
-                        'type': email['type'],
+                if is_excluded:
+                    skipped.append({
+                        'type': email_type,
+                        'date': email_date,
+                        'reason': 'In exclusion window'
+                    })
+                else:
+                    scheduled.append({
+                        'type': email_type,
                         'date': email_date
                     })
-        else:
-            # For states without birthday/effective_date rules, schedule all emails
-            for email in emails_to_schedule:
-                result['scheduled'].append({
-                    'type': email['type'],
-                    'date': email['date']
-                })
 
-        # Sort scheduled emails by date
-        result['scheduled'].sort(key=lambda x: x['date'])
+        # Sort scheduled emails by date; itemgetter extracts the keys in C
+        scheduled.sort(key=itemgetter('date'))
 
         return result
 
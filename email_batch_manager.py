@@ -21,6 +21,17 @@ from email_template_engine import EmailTemplateEngine
 # Initialize email template engine
 template_engine = EmailTemplateEngine()
 
+# Insert used by every batch initializer. Rows are tuples of
+# (org_id, contact_id, email_type, scheduled_date, send_mode, test_email, batch_id)
+INSERT_TRACKING_SQL = """
+    INSERT INTO email_send_tracking 
+    (org_id, contact_id, email_type, scheduled_date, send_status, send_mode, test_email, batch_id)
+    VALUES (?, ?, ?, ?, 'pending', ?, ?, ?)
+"""
+
+# Email types a batch may be initialized with
+VALID_EMAIL_TYPES = frozenset(['birthday', 'effective_date', 'anniversary', 'aep', 'post_window'])
+
 class EmailBatchManager:
     """
     Manages email batches and sending process with tracking.
@@ -87,8 +98,7 @@ class EmailBatchManager:
             raise ValueError("Test email is required for test mode")
             
         # Validate email type
-        valid_email_types = ['birthday', 'effective_date', 'anniversary', 'aep', 'post_window']
-        if email_type not in valid_email_types:
+        if email_type not in VALID_EMAIL_TYPES:
             raise ValueError(f"Invalid email type: {email_type}")
         
         # Generate batch ID with explicit "single" indicator
@@ -111,27 +121,15 @@ class EmailBatchManager:
             
             # Get a set of unique contact IDs
             unique_contact_ids = set(contact_ids)
-            total_emails = 0
+            row_test_email = test_email if send_mode == 'test' else None
             
-            # Insert one email per contact
-            for contact_id in unique_contact_ids:
-                cursor.execute(
-                    """
-                    INSERT INTO email_send_tracking 
-                    (org_id, contact_id, email_type, scheduled_date, send_status, send_mode, test_email, batch_id)
-                    VALUES (?, ?, ?, ?, 'pending', ?, ?, ?)
-                    """,
-                    (
-                        org_id, 
-                        contact_id, 
-                        email_type, 
-                        today_str, 
-                        send_mode, 
-                        test_email if send_mode == 'test' else None, 
-                        batch_id
-                    )
-                )
-                total_emails += 1
+            # Insert one email per contact in a single batched statement
+            rows = [
+                (org_id, contact_id, email_type, today_str, send_mode, row_test_email, batch_id)
+                for contact_id in unique_contact_ids
+            ]
+            cursor.executemany(INSERT_TRACKING_SQL, rows)
+            total_emails = len(rows)
             
             # Commit the transaction
             conn.commit()
@@ -188,9 +186,8 @@ class EmailBatchManager:
             raise ValueError("Test email is required for test mode")
             
         # Validate email types
-        valid_email_types = ['birthday', 'effective_date', 'anniversary', 'aep', 'post_window']
         for email_type in email_types:
-            if email_type not in valid_email_types:
+            if email_type not in VALID_EMAIL_TYPES:
                 raise ValueError(f"Invalid email type: {email_type}")
         
         # Generate batch ID with timestamp for better tracking
@@ -236,6 +233,10 @@ class EmailBatchManager:
             # Start a transaction
             cursor = conn.cursor()
             
+            # Collect rows as tuples and insert them with one executemany call
+            rows = []
+            row_test_email = test_email if send_mode == 'test' else None
+            
             # Special handling for bulk mode - create an email for each contact
             if scope == 'bulk':
                 # Get all contact IDs we should include
@@ -255,31 +256,19 @@ class EmailBatchManager:
                 for contact_id in included_contact_ids:
                     # Create one record for each selected email type
                     for email_type in email_types:
-                        cursor.execute(
-                            """
-                            INSERT INTO email_send_tracking 
-                            (org_id, contact_id, email_type, scheduled_date, send_status, send_mode, test_email, batch_id)
-                            VALUES (?, ?, ?, ?, 'pending', ?, ?, ?)
-                            """,
-                            (
-                                org_id, 
-                                contact_id, 
-                                email_type, 
-                                today_str, 
-                                send_mode, 
-                                test_email if send_mode == 'test' else None, 
-                                batch_id
-                            )
-                        )
-                        total_emails += 1
+                        rows.append((org_id, contact_id, email_type, today_str, send_mode, row_test_email, batch_id))
             
             # Regular mode - process each contact's scheduled emails
             else:
+                # Sets make the per-contact and per-email membership checks O(1)
+                contact_id_set = set(contact_ids) if contact_ids else None
+                email_type_set = set(email_types)
+                
                 for contact_data in scheduled_data:
                     contact_id = contact_data.get('contact_id')
                     
                     # Skip if contact_id not in the list
-                    if contact_ids and str(contact_id) not in contact_ids:
+                    if contact_id_set and str(contact_id) not in contact_id_set:
                         continue
                     
                     scheduled_emails = contact_data.get('emails', [])
@@ -289,7 +278,7 @@ class EmailBatchManager:
                         email_date_str = email.get('date')
                         
                         # Skip if email type not in the list or the email is marked as skipped
-                        if email_type not in email_types or email.get('skipped', False):
+                        if email_type not in email_type_set or email.get('skipped', False):
                             continue
                         
                         # Parse the email date
@@ -303,25 +292,10 @@ class EmailBatchManager:
                         if email_date < start_date or email_date > end_date:
                             continue
                         
-                        # Create a record in the email_send_tracking table
-                        cursor.execute(
-                            """
-                            INSERT INTO email_send_tracking 
-                            (org_id, contact_id, email_type, scheduled_date, send_status, send_mode, test_email, batch_id)
-                            VALUES (?, ?, ?, ?, 'pending', ?, ?, ?)
-                            """,
-                            (
-                                org_id, 
-                                contact_id, 
-                                email_type, 
-                                email_date_str, 
-                                send_mode, 
-                                test_email if send_mode == 'test' else None, 
-                                batch_id
-                            )
-                        )
-                        
-                        total_emails += 1
+                        # Queue a record for the email_send_tracking table
+                        rows.append((org_id, contact_id, email_type, email_date_str, send_mode, row_test_email, batch_id))
+            
+            cursor.executemany(INSERT_TRACKING_SQL, rows)
             
             # Commit the transaction
             conn.commit()
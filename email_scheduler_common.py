@@ -4,6 +4,7 @@ Simplified version that only includes essential constants and utility functions.
 """
 
 from datetime import date, datetime, timedelta
+from functools import lru_cache
 import logging
 import os
 import json
@@ -52,6 +53,9 @@ ALL_STATES = [
     'DC'
 ]
 
+# Set form of ALL_STATES for membership tests
+ALL_STATE_SET = frozenset(ALL_STATES)
+
 # Email type constants
 EMAIL_TYPE_BIRTHDAY = "birthday"
 EMAIL_TYPE_EFFECTIVE_DATE = "effective_date"
@@ -66,6 +70,21 @@ except Exception as e:
     logger.error(f"Failed to load zipData.json: {e}")
     ZIP_DATA = {}
 
+@lru_cache(maxsize=1)
+def _zip3_states():
+    """
+    Most common state for each 3-digit ZIP prefix in ZIP_DATA; used to place ZIP
+    codes that are missing from zipData.json. Built on first use, so importers
+    that never need the fallback don't scan the ZIP table
+    """
+    prefix_counts = {}
+    for zip_str, zip_info in ZIP_DATA.items():
+        state = zip_info.get('state') if isinstance(zip_info, dict) else None
+        if state:
+            counts = prefix_counts.setdefault(zip_str[:3], {})
+            counts[state] = counts.get(state, 0) + 1
+    return {prefix: max(counts, key=counts.get) for prefix, counts in prefix_counts.items()}
+
 def get_state_from_zip(zip_code: str) -> Optional[str]:
     """
     Get state from ZIP code using zipData.json
@@ -87,6 +106,25 @@ def get_state_from_zip(zip_code: str) -> Optional[str]:
         logger.warning(f"Error getting state for ZIP {zip_code}: {e}")
     return None
 
+def get_state_from_zip_prefix(zip_code: str) -> Optional[str]:
+    """
+    Best-guess state from the 3-digit prefix of a ZIP code, for ZIP codes that
+    get_state_from_zip cannot find. A prefix maps to a single state for all but
+    a handful of border ZIPs.
+    
+    Args:
+        zip_code: ZIP code as string (ZIP+4 and dropped leading zeros are accepted)
+        
+    Returns:
+        Two-letter state code, or None if the prefix is unknown
+    """
+    if not zip_code:
+        return None
+    zip_str = str(zip_code).strip().split('-')[0]
+    if not zip_str.isdigit():
+        return None
+    return _zip3_states().get(zip_str[:5].zfill(5)[:3])
+
 # Helper function to check if a year is a leap year
 def is_leap_year(year):
     """Returns True if the given year is a leap year, False otherwise"""
@@ -122,3 +160,17 @@ def is_month_end(date_obj):
     # If the date is the day before the first of next month, it's the last day
     return (next_month - timedelta(days=1)) == date_obj
 
+
+# Helper function to pre-format every date in a scheduling window
+def build_date_strings(start_date, end_date):
+    """
+    Map each date from start_date to end_date (inclusive) to its YYYY-MM-DD string,
+    so per-email loops can look formatted dates up instead of re-formatting them
+    """
+    date_strings = {}
+    one_day = timedelta(days=1)
+    current = start_date
+    while current <= end_date:
+        date_strings[current] = current.isoformat()
+        current += one_day
+    return date_strings
@@ -5,14 +5,67 @@ Handles scheduling of emails based on contact rules and dates.
 
 import asyncio
 import logging
+from concurrent.futures import ProcessPoolExecutor
 from datetime import date, datetime, timedelta
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Iterator
 from contact_rule_engine import ContactRuleEngine
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _schedule_contact(rule_engine: ContactRuleEngine, contact: Dict[str, Any], current_date: date,
+                      end_date: date, total_contacts: int = 1, contact_index: int = 0) -> Dict[str, Any]:
+    """
+    Schedule emails for one contact, tagging the result with its contact ID.
+    Shared by the sync and async entry points; errors become an 'all' skip entry.
+    Every result has 'contact_id', 'scheduled' and 'skipped' keys, so consumers
+    can index them directly.
+    """
+    try:
+        # Use the rule engine's calculate_email_dates method which handles all email types
+        result = rule_engine.calculate_email_dates(
+            contact=contact,
+            current_date=current_date,
+            end_date=end_date,
+            total_contacts=total_contacts,
+            contact_index=contact_index
+        )
+        result['contact_id'] = contact.get('id')
+        return result
+    except Exception as e:
+        logger.error(f"Error processing contact {contact.get('id')}: {e}")
+        return {
+            "contact_id": contact.get('id'),
+            "scheduled": [],
+            "skipped": [{
+                "type": "all",
+                "reason": f"Processing error: {str(e)}"
+            }]
+        }
+
+# Rule engine used by process-pool workers; built once per worker process by
+# _init_worker rather than once per batch
+_worker_rule_engine: Optional[ContactRuleEngine] = None
+
+def _init_worker(config: Dict[str, Any]) -> None:
+    """Process-pool initializer: build this worker's rule engine from the scheduler's config"""
+    global _worker_rule_engine
+    _worker_rule_engine = ContactRuleEngine(config=config)
+
+def _schedule_contacts(rule_engine: ContactRuleEngine, batch: List[Dict[str, Any]], current_date: date,
+                       end_date: date, total_contacts: int) -> List[Dict[str, Any]]:
+    """Schedule one batch of contacts; contacts are indexed within the batch"""
+    return [
+        _schedule_contact(rule_engine, contact, current_date, end_date, total_contacts, idx)
+        for idx, contact in enumerate(batch)
+    ]
+
+def _schedule_batch(batch: List[Dict[str, Any]], current_date: date, end_date: date,
+                    total_contacts: int) -> List[Dict[str, Any]]:
+    """Schedule one batch of contacts inside a process-pool worker"""
+    return _schedule_contacts(_worker_rule_engine, batch, current_date, end_date, total_contacts)
+
 class EmailScheduler:
     """Processes contacts to schedule emails using rule engine"""
     
@@ -31,35 +84,18 @@ class EmailScheduler:
         Returns:
             Dictionary containing scheduled and skipped emails
         """
-        try:
-            # Use the rule engine's calculate_email_dates method which handles all email types
-            result = self.rule_engine.calculate_email_dates(
-                contact=contact,
-                current_date=current_date,
-                end_date=end_date
-            )
-            
-            # Add contact ID to result
-            result['contact_id'] = contact.get('id')
-            return result
-            
-        except Exception as e:
-            logger.error(f"Error processing contact {contact.get('id')}: {e}")
-            return {
-                "contact_id": contact.get('id'),
-                "scheduled": [],
-                "skipped": [{
-                    "type": "all",
-                    "reason": f"Processing error: {str(e)}"
-                }]
-            }
+        return _schedule_contact(self.rule_engine, contact, current_date, end_date)
 
 class AsyncEmailProcessor:
     """Allows for asynchronous processing of contacts in batches"""
     
-    def __init__(self, scheduler: EmailScheduler, batch_size: int = 100):
+    def __init__(self, scheduler: EmailScheduler, batch_size: int = 100, max_workers: Optional[int] = None):
         self.scheduler = scheduler
         self.batch_size = batch_size
+        # Scheduling is CPU-bound, so batches only run concurrently in separate processes.
+        # The pool is opt-in: forking from a threaded server (uvicorn) can deadlock, so
+        # by default batches run on a worker thread in this process
+        self.max_workers = max_workers or 1
         
     async def process_contacts(self, contacts: List[Dict[str, Any]], current_date: date, end_date: date) -> List[Dict[str, Any]]:
         """
@@ -73,6 +109,10 @@ class AsyncEmailProcessor:
         Returns:
             List of results for each contact
         """
+        # A pool only pays for itself with more than one worker and more than one batch
+        if self.max_workers > 1 and len(contacts) > self.batch_size:
+            return await self._process_contacts_in_pool(contacts, current_date, end_date)
+        
         results = []
         total_contacts = len(contacts)
         
@@ -80,48 +120,52 @@ class AsyncEmailProcessor:
         for i in range(0, len(contacts), self.batch_size):
             batch = contacts[i:i + self.batch_size]
             
-            # Create tasks for batch
-            tasks = [
-                asyncio.create_task(self._process_contact(contact, current_date, end_date, total_contacts, idx))
-                for idx, contact in enumerate(batch)
-            ]
-            
-            # Wait for batch to complete
-            batch_results = await asyncio.gather(*tasks)
-            results.extend(batch_results)
+            # Scheduling is pure computation with nothing to await, so a task per
+            # contact only adds overhead. Each batch runs whole on a worker thread,
+            # which keeps the event loop (and any server on it) responsive meanwhile
+            results.extend(await asyncio.to_thread(
+                _schedule_contacts, self.scheduler.rule_engine, batch, current_date, end_date,
+                total_contacts
+            ))
             
             logger.info(f"Processed batch of {len(batch)} contacts ({i + len(batch)}/{len(contacts)})")
             
         return results
+    
+    async def _process_contacts_in_pool(self, contacts: List[Dict[str, Any]], current_date: date,
+                                        end_date: date) -> List[Dict[str, Any]]:
+        """
+        Process batches in parallel on a process pool, keeping the event loop free.
+        Results come back in input order, identical to the inline path.
+        """
+        results = []
+        total_contacts = len(contacts)
+        loop = asyncio.get_running_loop()
         
-    async def _process_contact(self, contact: Dict[str, Any], current_date: date, end_date: date, 
-                             total_contacts: int, contact_index: int) -> Dict[str, Any]:
-        """Process a single contact asynchronously"""
+        executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker,
+                                       initargs=(self.scheduler.rule_engine.config,))
         try:
-            # Use the rule engine's calculate_email_dates method with contact distribution info
-            result = self.scheduler.rule_engine.calculate_email_dates(
-                contact=contact,
-                current_date=current_date,
-                end_date=end_date,
-                total_contacts=total_contacts,
-                contact_index=contact_index
-            )
-            result['contact_id'] = contact.get('id')
-            return result
-        except Exception as e:
-            logger.error(f"Error processing contact {contact.get('id')}: {e}")
-            return {
-                "contact_id": contact.get('id'),
-                "scheduled": [],
-                "skipped": [{
-                    "type": "all",
-                    "reason": f"Processing error: {str(e)}"
-                }]
-            }
+            batch_starts = range(0, len(contacts), self.batch_size)
+            futures = [
+                loop.run_in_executor(executor, _schedule_batch, contacts[i:i + self.batch_size],
+                                     current_date, end_date, total_contacts)
+                for i in batch_starts
+            ]
+            
+            for i, future in zip(batch_starts, futures):
+                batch_results = await future
+                results.extend(batch_results)
+                logger.info(f"Processed batch of {len(batch_results)} contacts ({i + len(batch_results)}/{len(contacts)})")
+        finally:
+            # Don't block the event loop joining workers; on error drop the queued batches
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        return results
         
 
 async def main_async(contacts: List[Dict[str, Any]], current_date: Optional[date] = None, 
-                    end_date: Optional[date] = None, batch_size: int = 100) -> List[Dict[str, Any]]:
+                    end_date: Optional[date] = None, batch_size: int = 100,
+                    max_workers: Optional[int] = None) -> List[Dict[str, Any]]:
     """
     Main async entry point for email scheduling
     
@@ -130,6 +174,8 @@ async def main_async(contacts: List[Dict[str, Any]], current_date: Optional[date
         current_date: Optional start date (defaults to today)
         end_date: Optional end date (defaults to 2 years from start)
         batch_size: Number of contacts to process in parallel
+        max_workers: Worker processes to schedule batches on; more than 1 opts in to a
+                     process pool (defaults to scheduling on a thread in this process)
         
     Returns:
         List of results for each contact
@@ -140,21 +186,25 @@ async def main_async(contacts: List[Dict[str, Any]], current_date: Optional[date
     if not end_date:
         end_date = current_date + timedelta(days=365 * 2)
         
-    processor = AsyncEmailProcessor(EmailScheduler(), batch_size)
+    processor = AsyncEmailProcessor(EmailScheduler(), batch_size, max_workers)
     return await processor.process_contacts(contacts, current_date, end_date)
 
-def main_sync(contacts: List[Dict[str, Any]], current_date: Optional[date] = None,
-              end_date: Optional[date] = None) -> List[Dict[str, Any]]:
+def iter_schedule_sync(contacts: List[Dict[str, Any]], current_date: Optional[date] = None,
+                       end_date: Optional[date] = None,
+                       scheduler: Optional[EmailScheduler] = None) -> Iterator[Dict[str, Any]]:
     """
-    Main synchronous entry point for email scheduling
+    Synchronously schedule contacts, yielding each result as soon as it is ready
+    so callers can stream results out instead of holding them all in memory
     
     Args:
         contacts: List of contacts to process
         current_date: Optional start date (defaults to today)
         end_date: Optional end date (defaults to 2 years from start)
+        scheduler: Optional scheduler to reuse, so long-running callers keep its
+                   loaded rules and caches across runs (defaults to a new one)
         
-    Returns:
-        List of results for each contact
+    Yields:
+        Result for each contact, in input order
     """
     # Set default dates if not provided
     if not current_date:
@@ -162,34 +212,28 @@ def main_sync(contacts: List[Dict[str, Any]], current_date: Optional[date] = Non
     if not end_date:
         end_date = current_date + timedelta(days=365 * 2)
         
-    scheduler = EmailScheduler()
-    results = []
+    if scheduler is None:
+        scheduler = EmailScheduler()
     total_contacts = len(contacts)
     
     for i, contact in enumerate(contacts):
-        try:
-            result = scheduler.rule_engine.calculate_email_dates(
-                contact=contact,
-                current_date=current_date,
-                end_date=end_date,
-                total_contacts=total_contacts,
-                contact_index=i
-            )
-            result['contact_id'] = contact.get('id')
-            results.append(result)
-            
-            if (i + 1) % 100 == 0:
-                logger.info(f"Processed {i + 1}/{len(contacts)} contacts")
-                
-        except Exception as e:
-            logger.error(f"Error processing contact {contact.get('id')}: {e}")
-            results.append({
-                "contact_id": contact.get('id'),
-                "scheduled": [],
-                "skipped": [{
-                    "type": "all",
-                    "reason": f"Processing error: {str(e)}"
-                }]
-            })
-            
-    return results 
\ No newline at end of file
+        yield _schedule_contact(scheduler.rule_engine, contact, current_date, end_date,
+                                total_contacts, i)
+        
+        if (i + 1) % 100 == 0:
+            logger.info(f"Processed {i + 1}/{len(contacts)} contacts")
+
+def main_sync(contacts: List[Dict[str, Any]], current_date: Optional[date] = None,
+              end_date: Optional[date] = None) -> List[Dict[str, Any]]:
+    """
+    Main synchronous entry point for email scheduling
+    
+    Args:
+        contacts: List of contacts to process
+        current_date: Optional start date (defaults to today)
+        end_date: Optional end date (defaults to 2 years from start)
+        
+    Returns:
+        List of results for each contact
+    """
+    return list(iter_schedule_sync(contacts, current_date, end_date))
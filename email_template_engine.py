@@ -4,6 +4,7 @@ Uses Jinja2 for template rendering and YAML for metadata.
 """
 
 import os
+from functools import lru_cache
 from datetime import datetime, date
 from typing import Dict, Any, Optional
 import jinja2
@@ -38,6 +39,14 @@ class EmailTemplateEngine:
         
         # Register custom filters
         self._register_filters()
+        
+        # Jinja caches file templates but not from_string, and subject lines come
+        # from a handful of metadata files, so keep the compiled subjects around
+        self._compile_subject = lru_cache(maxsize=256)(self.text_env.from_string)
+        
+        # Parsed metadata per template type with the file mtime it was read at;
+        # an edited file is re-read, like Jinja's auto_reload does for templates
+        self._metadata_cache = {}
     
     def _register_filters(self):
         """Register custom Jinja2 filters"""
@@ -78,8 +87,14 @@ class EmailTemplateEngine:
         """Load metadata for a template type from YAML"""
         metadata_file = os.path.join(self.template_dir, f"{template_type}_metadata.yaml")
         try:
+            mtime = os.stat(metadata_file).st_mtime_ns
+            cached = self._metadata_cache.get(template_type)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
             with open(metadata_file, 'r') as f:
-                return yaml.safe_load(f)
+                metadata = yaml.safe_load(f)
+            self._metadata_cache[template_type] = (mtime, metadata)
+            return metadata
         except FileNotFoundError:
             logger.warning(f"No metadata file found for {template_type}")
             return {}
@@ -162,19 +177,8 @@ class EmailTemplateEngine:
             
         return vars
     
-    def render_email(self, template_type: str, contact: Dict[str, Any], email_date: date, html: bool = False) -> Dict[str, str]:
-        """
-        Render an email template
-        
-        Args:
-            template_type: Type of email template (birthday, effective_date, aep, post_window)
-            contact: Contact information dictionary
-            email_date: Date the email will be sent
-            html: Whether to render HTML version (default: False)
-        
-        Returns:
-            Dictionary with subject and body/html keys
-        """
+    def _prepare_render(self, template_type: str, contact: Dict[str, Any], email_date: date):
+        """Build the template variables and the unrendered subject line for an email"""
         # Prepare template variables
         template_vars = self._get_template_vars(template_type, contact, email_date)
         
@@ -195,11 +199,14 @@ class EmailTemplateEngine:
         # Get metadata for subject line
         metadata = self._load_template_metadata(template_type)
         subject = metadata.get('subject', f"{template_type.title()} Email for {contact.get('first_name', '')}")
-        
+        return template_vars, subject
+    
+    def _render_prepared(self, template_type: str, template_vars: Dict[str, Any], subject: str, html: bool) -> Dict[str, str]:
+        """Render one version of an email from variables built by _prepare_render"""
         try:
             # Render subject line with template vars
             logger.debug("Attempting to render subject line")
-            subject = self.text_env.from_string(subject).render(**template_vars)
+            subject = self._compile_subject(subject).render(**template_vars)
             
             if html:
                 # Render HTML template with template vars
@@ -237,6 +244,40 @@ class EmailTemplateEngine:
                     'body': f"Error rendering template: {e}"
                 }
     
+    def render_email(self, template_type: str, contact: Dict[str, Any], email_date: date, html: bool = False) -> Dict[str, str]:
+        """
+        Render an email template
+        
+        Args:
+            template_type: Type of email template (birthday, effective_date, aep, post_window)
+            contact: Contact information dictionary
+            email_date: Date the email will be sent
+            html: Whether to render HTML version (default: False)
+        
+        Returns:
+            Dictionary with subject and body/html keys
+        """
+        template_vars, subject = self._prepare_render(template_type, contact, email_date)
+        return self._render_prepared(template_type, template_vars, subject, html)
+    
+    def render_email_with_html(self, template_type: str, contact: Dict[str, Any], email_date: date) -> Dict[str, str]:
+        """
+        Render the text and HTML versions of an email from a single set of template variables
+        
+        Args:
+            template_type: Type of email template (birthday, effective_date, aep, post_window)
+            contact: Contact information dictionary
+            email_date: Date the email will be sent
+        
+        Returns:
+            Dictionary with subject, body and html keys; subject and body match
+            render_email(html=False) and html matches render_email(html=True)
+        """
+        template_vars, subject = self._prepare_render(template_type, contact, email_date)
+        content = self._render_prepared(template_type, template_vars, subject, html=False)
+        content['html'] = self._render_prepared(template_type, template_vars, subject, html=True)['html']
+        return content
+    
     def preview_email(self, template_type: str, contact: Dict[str, Any], email_date: date):
         """Preview both text and HTML versions of an email"""
         print(f"\nPreviewing {template_type} email for {contact.get('first_name')} {contact.get('last_name')}")
@@ -0,0 +1,26 @@
+-- Migration script to add the scheduled_emails table to organization databases
+-- Columns match the scheduled_emails table in main.db, so rows written by
+-- org_utils.write_scheduled_emails_to_db have the same shape in either database.
+-- The organizations foreign key is left out because organization databases do not
+-- have an organizations table.
+
+-- Create the scheduled_emails table if it doesn't exist
+CREATE TABLE IF NOT EXISTS scheduled_emails (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    organization_id INTEGER NOT NULL,
+    contact_id INTEGER NOT NULL,
+    email_type TEXT NOT NULL,
+    scheduled_at DATETIME NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    reason TEXT,
+    sent_at DATETIME,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Create a trigger to update the updated_at timestamp when a record is modified
+CREATE TRIGGER IF NOT EXISTS update_scheduled_emails_timestamp
+AFTER UPDATE ON scheduled_emails
+BEGIN
+    UPDATE scheduled_emails SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
+END;
@@ -6,6 +6,7 @@ from typing import List, Dict, Any, Optional
 import logging
 from dotenv import load_dotenv
 from datetime import date, datetime
+from functools import lru_cache
 import pandas as pd
 
 # Load environment variables from .env file
@@ -21,12 +22,25 @@ except Exception as e:
     logger.error(f"Error loading zipData.json: {e}")
     ZIP_DATA = {}
 
-def connect_to_db(db_path: str) -> sqlite3.Connection:
+# Connection tuning applied to every database opened through connect_to_db:
+# a 256 MiB memory map and a 64 MiB page cache. All of these are per-connection;
+# journal_mode=WAL is deliberately left out, since it persists in the file and
+# leaves -wal/-shm files behind that dump_and_convert.sh's rebuild (rm -f of the
+# .db only) would orphan. Without WAL, synchronous stays at its FULL default so
+# writes through these connections keep their crash durability
+SQLITE_PRAGMAS = (
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA temp_store=MEMORY",
+)
+
+def connect_to_db(db_path: str, query_only: bool = False) -> sqlite3.Connection:
     """
     Connect to SQLite database and set row factory for dictionary results
     
     Args:
         db_path: Path to the SQLite database file
+        query_only: Reject writes on this connection (PRAGMA query_only)
         
     Returns:
         SQLite connection object
@@ -38,11 +52,26 @@ def connect_to_db(db_path: str) -> sqlite3.Connection:
     try:
         conn = sqlite3.connect(db_path)
         conn.row_factory = sqlite3.Row
-        return conn
     except sqlite3.Error as e:
         logger.error(f"Error connecting to database {db_path}: {e}")
         sys.exit(1)
 
+    # Read-only is applied first and on its own, so a failed tuning pragma can't skip it
+    if query_only:
+        try:
+            conn.execute("PRAGMA query_only=1")
+        except sqlite3.Error as e:
+            logger.warning(f"Could not make connection to {db_path} read-only: {e}")
+
+    # Tuning is best-effort; a database that rejects a pragma is still usable
+    try:
+        for pragma in SQLITE_PRAGMAS:
+            conn.execute(pragma)
+    except sqlite3.Error as e:
+        logger.warning(f"Could not apply connection pragmas to {db_path}: {e}")
+
+    return conn
+
 def get_organization_details(main_db_path: str, org_id: int) -> Dict[str, Any]:
     """
     Get organization details from the main database
@@ -56,11 +85,11 @@ def get_organization_details(main_db_path: str, org_id: int) -> Dict[str, Any]:
     """
     logger.info(f"Getting organization details for org_id: {org_id}")
     
-    conn = connect_to_db(main_db_path)
+    conn = connect_to_db(main_db_path, query_only=True)
     try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, name, turso_db_url, turso_auth_token FROM organizations WHERE id = ?", (org_id,))
-        org = cursor.fetchone()
+        org = conn.execute(
+            "SELECT id, name, turso_db_url, turso_auth_token FROM organizations WHERE id = ?", (org_id,)
+        ).fetchone()
         
         if not org:
             logger.error(f"Organization with ID {org_id} not found in the database")
@@ -73,8 +102,12 @@ def get_organization_details(main_db_path: str, org_id: int) -> Dict[str, Any]:
     finally:
         conn.close()
 
+@lru_cache(maxsize=None)
 def get_state_from_zip(zip_code: str) -> str:
-    """Get the state from a ZIP code using zipData.json"""
+    """
+    Get the state from a ZIP code using zipData.json. Results are memoized per raw
+    ZIP value: contacts in an org share ZIP codes heavily and ZIP_DATA never changes.
+    """
     if not zip_code:
         return None
         
@@ -95,7 +128,7 @@ def get_state_from_zip(zip_code: str) -> str:
         # Look up state
         state = ZIP_DATA.get(zip_str, {}).get('state')
         if state:
-            logger.debug(f"Found state {state} for ZIP code {zip_str}")
+            logger.debug("Found state %s for ZIP code %s", state, zip_str)
             return state
         else:
             logger.warning(f"No state found for ZIP code {zip_str}")
@@ -139,6 +172,23 @@ def get_n_contacts_from_org_db(org_db_path: str, org_id: int, n: int) -> List[Di
     
     return get_contacts_from_org_db(org_db_path, org_id, contact_ids=n_contact_ids)
 
+def _to_iso_date_column(values: pd.Series) -> pd.Series:
+    """
+    Convert a column of date values to ISO format strings in one vectorized pass.
+    Empty values are left as-is, and values that cannot be parsed are passed through
+    unchanged so format_contact_data can still try parse_date_flexible on them.
+    """
+    present = values.notna() & (values != '')
+
+    # Fast path for the common YYYY-MM-DD case, then fall back to per-value inference
+    parsed = pd.to_datetime(values.where(present), format='ISO8601', errors='coerce')
+    remaining = present & parsed.isna()
+    if remaining.any():
+        parsed[remaining] = pd.to_datetime(values[remaining], format='mixed', errors='coerce')
+
+    iso_dates = parsed.dt.strftime('%Y-%m-%d')
+    return iso_dates.where(parsed.notna(), values).astype(object)
+
 def get_contacts_from_org_db(org_db_path: str, org_id: int, contact_ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
     """
     Get contacts from an organization's database
@@ -151,8 +201,6 @@ def get_contacts_from_org_db(org_db_path: str, org_id: int, contact_ids: Optiona
     Returns:
         List of contact dictionaries
     """
-    contacts = []
-    
     # Build the SQL query
     sql = """
         SELECT id, first_name, last_name, email, state, birth_date, effective_date
@@ -170,20 +218,15 @@ def get_contacts_from_org_db(org_db_path: str, org_id: int, contact_ids: Optiona
     
     try:
         with sqlite3.connect(org_db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            cursor.execute(sql, params)
-            rows = cursor.fetchall()
-            
-            for row in rows:
-                contact = dict(row)
-                # Convert dates to ISO format strings if they exist
-                if contact.get('birth_date'):
-                    contact['birth_date'] = pd.to_datetime(contact['birth_date']).date().isoformat()
-                if contact.get('effective_date'):
-                    contact['effective_date'] = pd.to_datetime(contact['effective_date']).date().isoformat()
-                contacts.append(contact)
-                
+            # Load all rows in one pass so date parsing can be vectorized
+            df = pd.read_sql_query(sql, conn, params=params)
+
+        # Convert dates to ISO format strings if they exist
+        for date_column in ('birth_date', 'effective_date'):
+            df[date_column] = _to_iso_date_column(df[date_column])
+
+        contacts = df.to_dict('records')
+
     except sqlite3.Error as e:
         print(f"Database error: {e}")
         return []
@@ -223,7 +266,7 @@ def get_filtered_contacts_from_org_db(org_db_path: str, org_id: int,
     logger.info(f"Getting filtered contacts from organization database: {org_db_path}")
     logger.debug(f"Filter params - effective_date_start: {effective_date_start}, effective_date_end: {effective_date_end}, states: {states}, n: {n}, is_random: {is_random}")
     
-    conn = connect_to_db(org_db_path)
+    conn = connect_to_db(org_db_path, query_only=True)
     try:
         cursor = conn.cursor()
         
@@ -335,8 +378,8 @@ def get_filtered_contacts_from_org_db(org_db_path: str, org_id: int,
         if n is not None:
             query += f" LIMIT {n}"
         
-        logger.debug(f"Executing SQL query: {query}")
-        logger.debug(f"Query parameters: {params}")
+        logger.debug("Executing SQL query: %s", query)
+        logger.debug("Query parameters: %s", params)
         
         # Execute query
         cursor.execute(query, params)
@@ -349,19 +392,22 @@ def get_filtered_contacts_from_org_db(org_db_path: str, org_id: int,
                 break
                 
             for row in rows:
-                contact = dict(row)
-                contact['organization_id'] = org_id
+                # Resolve the state before building the dict so rows we drop cost nothing
+                zip_code = row['zip_code'] if 'zip_code' in columns else None
+                if not zip_code:
+                    logger.debug("No ZIP code found for contact %s", row['id'])
+                    continue
                 
                 # Always try to determine state from ZIP code
-                if contact.get('zip_code'):
-                    state = get_state_from_zip(contact['zip_code'])
-                    if state:
-                        contact['state'] = state
-                        contacts.append(contact)
-                    else:
-                        logger.debug(f"Could not determine state from ZIP code {contact.get('zip_code')} for contact {contact.get('id')}")
-                else:
-                    logger.debug(f"No ZIP code found for contact {contact.get('id')}")
+                state = get_state_from_zip(zip_code)
+                if not state:
+                    logger.debug("Could not determine state from ZIP code %s for contact %s", zip_code, row['id'])
+                    continue
+                
+                contact = dict(row)
+                contact['organization_id'] = org_id
+                contact['state'] = state
+                contacts.append(contact)
             
         logger.info(f"Retrieved {len(contacts)} contacts from organization database with filters")
         return contacts
@@ -371,6 +417,18 @@ def get_filtered_contacts_from_org_db(org_db_path: str, org_id: int,
     finally:
         conn.close()
 
+def _fast_iso_date(date_str: str) -> Optional[date]:
+    """Parse a YYYY-MM-DD string by slicing, or return None so callers can fall back"""
+    if len(date_str) == 10 and date_str[4] == '-' and date_str[7] == '-':
+        try:
+            parsed = date(int(date_str[0:4]), int(date_str[5:7]), int(date_str[8:10]))
+        except ValueError:
+            return None
+        # Same year range parse_date_flexible accepts
+        if 1900 <= parsed.year <= 2100:
+            return parsed
+    return None
+
 def parse_date_flexible(date_str: str) -> Optional[date]:
     """Parse a date string flexibly, handling various formats and cleaning input"""
     if not date_str:
@@ -412,6 +470,24 @@ def parse_date_flexible(date_str: str) -> Optional[date]:
             return 1900 + year
         return year
 
+    # Dispatch fixed-width numeric dates on their separator positions instead of
+    # running the format loop below; unmatched input falls through unchanged
+    s = orig_date_str
+    if len(s) == 10 and s[:2].isdigit() and s[8:].isdigit():
+        if s[4] == s[7] and s[4] in '-/' and s[2:4].isdigit() and s[5:7].isdigit():
+            # YYYY-MM-DD or YYYY/MM/DD
+            year, month, day = int(s[0:4]), int(s[5:7]), int(s[8:10])
+            if validate_year(year) and validate_day(year, month, day):
+                return date(year, month, day)
+        elif s[2] == s[5] and s[2] in '-/' and s[3:5].isdigit() and s[6:8].isdigit():
+            # DD/MM/YYYY is tried before MM/DD/YYYY, matching the format loop order
+            first, second, year = int(s[0:2]), int(s[3:5]), int(s[6:10])
+            if validate_year(year):
+                if validate_day(year, second, first):
+                    return date(year, second, first)
+                if validate_day(year, first, second):
+                    return date(year, first, second)
+
     # First try to handle month abbreviation formats (e.g., "Jul-59", "26-Jul-57")
     parts = orig_date_str.replace('/', '-').split('-')
     if len(parts) in [2, 3]:
@@ -554,21 +630,23 @@ def format_contact_data(contacts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         # Convert date fields if needed
         for date_field in ['birth_date', 'effective_date']:
             if formatted_contact[date_field]:
-                logger.debug(f"Processing {date_field}: {formatted_contact[date_field]}")
+                logger.debug("Processing %s: %s", date_field, formatted_contact[date_field])
                 if not isinstance(formatted_contact[date_field], date):
                     if isinstance(formatted_contact[date_field], str):
-                        parsed_date = parse_date_flexible(formatted_contact[date_field])
+                        # Database dates are almost always ISO; skip the flexible parser for them
+                        parsed_date = (_fast_iso_date(formatted_contact[date_field])
+                                       or parse_date_flexible(formatted_contact[date_field]))
                         if parsed_date:
                             formatted_contact[date_field] = parsed_date.isoformat()
-                            logger.debug(f"Parsed {date_field} to {formatted_contact[date_field]}")
+                            logger.debug("Parsed %s to %s", date_field, formatted_contact[date_field])
                         else:
                             logger.warning(f"Could not parse {date_field} for contact {formatted_contact['id']}: {formatted_contact[date_field]}")
                             formatted_contact[date_field] = None
                     else:
                         formatted_contact[date_field] = formatted_contact[date_field].isoformat()
-                        logger.debug(f"Converted {date_field} to ISO format: {formatted_contact[date_field]}")
+                        logger.debug("Converted %s to ISO format: %s", date_field, formatted_contact[date_field])
                 
-        logger.debug(f"Final formatted contact: {formatted_contact}")
+        logger.debug("Final formatted contact: %s", formatted_contact)
         formatted_contacts.append(formatted_contact)
         
     logger.info(f"Formatted {len(formatted_contacts)} contacts for scheduling")
@@ -662,6 +740,49 @@ def update_states_from_zip_codes(org_db_path: str) -> None:
     finally:
         conn.close()
 
+def write_scheduled_emails_to_db(org_db_path: str, org_id: int, results: List[Dict[str, Any]]) -> int:
+    """
+    Write scheduled emails from scheduler results into the scheduled_emails table
+    created by migrations/add_scheduled_emails.sql, as pending rows.
+    
+    All rows go in with one executemany in a single transaction, so a failure leaves
+    no partially written schedule behind. Without WAL the rollback journal only
+    keeps the pages that existed before the transaction, and appended rows add
+    almost nothing to it, so one transaction stays cheap even for large schedules.
+    
+    Args:
+        org_db_path: Path to the organization's database
+        org_id: Organization ID stored in each row's organization_id
+        results: Scheduler results, each with a contact_id and a list of scheduled emails
+        
+    Returns:
+        Number of rows inserted
+    """
+    conn = connect_to_db(org_db_path)
+    try:
+        rows = (
+            (org_id, int(result['contact_id']), email['type'], email['date'].isoformat()
+             if isinstance(email['date'], date) else str(email['date']))
+            for result in results
+            for email in result['scheduled']
+        )
+        
+        with conn:
+            cursor = conn.executemany(
+                "INSERT INTO scheduled_emails (organization_id, contact_id, email_type, scheduled_at) "
+                "VALUES (?, ?, ?, ?)",
+                rows
+            )
+        total_inserted = cursor.rowcount
+        
+        logger.info(f"Wrote {total_inserted} scheduled emails to {org_db_path}")
+        return total_inserted
+    except sqlite3.Error as e:
+        logger.error(f"Database error while writing scheduled emails: {e}")
+        raise
+    finally:
+        conn.close()
+
 def update_all_org_dbs_states() -> None:
     """
     Update state information in all organization databases.
@@ -6,78 +6,145 @@ Reads scheduled emails from the output JSON and sends them via SendGrid.
 import os
 import json
 import argparse
+import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime, timedelta
+import threading
 import time
+from itertools import islice
 from typing import Dict, List, Any, Optional
 
 from email_scheduler_common import logger
 from sendgrid_client import SendGridClient
 from email_template_engine import EmailTemplateEngine
 
+# orjson parses large schedule/contact files several times faster than the stdlib;
+# it is optional
+try:
+    import orjson
+    _fast_json_loads = orjson.loads
+except ImportError:
+    _fast_json_loads = None
+
+# Checked once per contact rather than on every send
+_EMAIL_RE = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
 # Initialize the template engine
 template_engine = EmailTemplateEngine()
 
 def get_email_content(email_type, contact, email_date):
-    """Get email content using the template engine"""
-    return template_engine.render_email(email_type, contact, email_date)
+    """Get subject, text body and HTML for an email in one pass of the template engine"""
+    return template_engine.render_email_with_html(email_type, contact, email_date)
+
+def parse_email_date(date_str: str) -> date:
+    """
+    Parse a YYYY-MM-DD date. date.fromisoformat handles the usual zero-padded form
+    much faster than strptime; strptime still covers unpadded values like 2025-1-5.
+    """
+    try:
+        return date.fromisoformat(date_str)
+    except ValueError:
+        return datetime.strptime(date_str, "%Y-%m-%d").date()
 
-def get_email_html_content(email_type, contact, email_date):
-    """Get HTML email content using the template engine"""
-    result = template_engine.render_email(email_type, contact, email_date, html=True)
-    return result['html']  # Return just the HTML string, not the whole dictionary
+def load_json_file(path: str) -> Any:
+    """
+    Parse a JSON file, using orjson when it is installed. Input orjson rejects but
+    the stdlib accepts (such as the NaN literals json.dump writes) falls back to json.
+    """
+    with open(path, 'rb') as f:
+        raw = f.read()
+    if _fast_json_loads is not None:
+        try:
+            return _fast_json_loads(raw)
+        except ValueError:
+            pass
+    return json.loads(raw)
 
 def load_scheduled_emails(input_file: str) -> List[Dict[str, Any]]:
     """Load scheduled emails from JSON file"""
     try:
-        with open(input_file, 'r') as f:
-            data = json.load(f)
-        return data
+        return load_json_file(input_file)
     except Exception as e:
         logger.error(f"Error loading scheduled emails from {input_file}: {e}")
         return []
 
-def load_contact_details(contact_id: str, contacts_file: str) -> Optional[Dict[str, Any]]:
-    """Load contact details from contacts file"""
+def load_contacts_by_id(contacts_file: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Load the contacts file once and index it by string contact ID, so each
+    scheduled contact is a dict lookup instead of a re-read and scan of the file.
+    The first contact with a given ID wins.
+    """
     try:
-        with open(contacts_file, 'r') as f:
-            contacts = json.load(f)
-        
-        # Find the contact by ID
-        for contact in contacts:
-            if str(contact.get('id')) == str(contact_id):
-                return contact
-        
-        logger.error(f"Contact {contact_id} not found in contacts file")
-        return None
+        contacts = load_json_file(contacts_file)
     except Exception as e:
         logger.error(f"Error loading contact details from {contacts_file}: {e}")
-        return None
+        return {}
+    
+    contacts_by_id = {}
+    for contact in contacts:
+        contacts_by_id.setdefault(str(contact.get('id')), contact)
+    return contacts_by_id
 
-def send_scheduled_emails(
-    scheduled_data: List[Dict[str, Any]], 
-    contacts_file: str,
-    dry_run: bool = True,
-    start_date: Optional[date] = None,
-    end_date: Optional[date] = None,
-    limit: Optional[int] = None,
-    delay: float = 0.0
-):
-    """Send scheduled emails using SendGrid"""
-    # Initialize the SendGrid client
-    client = SendGridClient(dry_run=dry_run)
+class _SendPacer:
+    """
+    Minimum interval between send starts, shared by every thread that sends. Each
+    send claims the next free slot under a lock and sleeps until it comes round, so
+    the interval holds however many workers are sending.
+    """
     
-    # Default to today if no start date provided
-    if start_date is None:
-        start_date = date.today()
+    __slots__ = ('interval', '_next_send_at', '_lock')
     
-    # Default to one year from start date if no end date provided
-    if end_date is None:
-        end_date = start_date + timedelta(days=365)
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._next_send_at = 0.0
+        self._lock = threading.Lock()
     
-    # Track stats
-    total_emails = 0
-    successful_emails = 0
-    failed_emails = 0
+    def wait(self) -> None:
+        """Block until this send may start"""
+        if self.interval <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start_at = max(now, self._next_send_at)
+            self._next_send_at = start_at + self.interval
+        if start_at > now:
+            time.sleep(start_at - now)
+
+def _paced_send(send, pacer: _SendPacer, to_email: str, content: Dict[str, Any], dry_run: bool):
+    """Send one rendered email once the shared pacer allows it"""
+    pacer.wait()
+    return send(
+        to_email=to_email,
+        subject=content['subject'],
+        content=content['body'],
+        html_content=content['html'],
+        dry_run=dry_run
+    )
+
+def _iter_scheduled_sends(
+    scheduled_data: List[Dict[str, Any]],
+    contacts_by_id: Dict[str, Dict[str, Any]],
+    start_date: date,
+    end_date: date
+):
+    """
+    Yield (contact_id, contact, to_email, email_type, email_date_str, email_date)
+    for every scheduled email that should be sent, applying the contact, address,
+    date range and duplicate checks. Being a generator, it stops reading the
+    schedule as soon as the caller has taken enough emails.
+    """
+    # Scheduled dates repeat across contacts; parse each distinct string once
+    parsed_dates = {}
+    
+    # (contact_id, email_type, date string) already handled, so repeated rows
+    # in the input are not sent twice
+    seen = set()
+    
+    # Zero-padded YYYY-MM-DD strings sort like the dates they name, so
+    # out-of-range rows in that form are dropped without parsing
+    start_str = start_date.isoformat()
+    end_str = end_date.isoformat()
     
     # Process each contact's scheduled emails
     for contact_data in scheduled_data:
@@ -87,8 +154,10 @@ def send_scheduled_emails(
         if not contact_id or not scheduled_emails:
             continue
         
-        # Load contact details
-        contact = load_contact_details(contact_id, contacts_file)
+        # Look up contact details
+        contact = contacts_by_id.get(str(contact_id))
+        if contact is None:
+            logger.error(f"Contact {contact_id} not found in contacts file")
         if not contact:
             logger.warning(f"Skipping emails for contact {contact_id}: Contact details not found")
             continue
@@ -99,6 +168,9 @@ def send_scheduled_emails(
             continue
         
         to_email = contact['email']
+        if _EMAIL_RE.match(to_email) is None:
+            logger.warning(f"Skipping emails for contact {contact_id}: Invalid email address {to_email}")
+            continue
         
         # Process scheduled emails for this contact
         for email in scheduled_emails:
@@ -108,55 +180,166 @@ def send_scheduled_emails(
             if not email_type or not email_date_str:
                 continue
             
+            # ISO dates order the same as strings, so out-of-range ones are dropped
+            # without parsing; anything else goes to the parser, which logs bad formats
+            if (len(email_date_str) == 10 and email_date_str[4] == email_date_str[7] == '-'
+                    and not (start_str <= email_date_str <= end_str)):
+                continue
+            
             # Parse the email date
             try:
-                email_date = datetime.strptime(email_date_str, "%Y-%m-%d").date()
+                email_date = parsed_dates.get(email_date_str)
+                if email_date is None:
+                    email_date = parsed_dates[email_date_str] = parse_email_date(email_date_str)
             except:
                 logger.error(f"Invalid date format for email: {email_date_str}")
                 continue
             
-            # Skip emails outside our date range
+            # Skip emails outside our date range before paying for a render
             if email_date < start_date or email_date > end_date:
                 continue
             
-            # Generate email content
+            email_key = (contact_id, email_type, email_date_str)
+            if email_key in seen:
+                logger.warning(f"Skipping duplicate {email_type} email for contact {contact_id} scheduled on {email_date_str}")
+                continue
+            seen.add(email_key)
+            
+            yield contact_id, contact, to_email, email_type, email_date_str, email_date
+
+def send_scheduled_emails(
+    scheduled_data: List[Dict[str, Any]], 
+    contacts_file: str,
+    dry_run: bool = True,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    limit: Optional[int] = None,
+    delay: float = 0.0,
+    concurrency: int = 1
+):
+    """
+    Send scheduled emails using SendGrid.
+    
+    With concurrency > 1, each email is handed to a dedicated pool of that many
+    worker threads as soon as it is rendered, so up to that many SendGrid requests
+    are in flight instead of waiting out each request's network round trip in turn.
+    At most twice that many rendered emails wait on the pool, and results are
+    counted in schedule order. A delay is a minimum interval between send starts
+    shared by all workers, so concurrency does not raise the send rate above it.
+    """
+    # Initialize the SendGrid client
+    client = SendGridClient(dry_run=dry_run)
+    
+    # Default to today if no start date provided
+    if start_date is None:
+        start_date = date.today()
+    
+    # Default to one year from start date if no end date provided
+    if end_date is None:
+        end_date = start_date + timedelta(days=365)
+    
+    # Read the contacts file once for the whole run
+    contacts_by_id = load_contacts_by_id(contacts_file)
+    
+    # Track stats
+    total_emails = 0
+    successful_emails = 0
+    failed_emails = 0
+    
+    # Treat the delay as a minimum interval between sends across all workers; time
+    # spent rendering counts towards it
+    pacer = _SendPacer(delay)
+    
+    # Concurrent sends not yet counted, oldest first:
+    # (email_type, contact_id, email_date_str, future)
+    in_flight = deque()
+    max_in_flight = concurrency * 2
+    
+    # Bound once so the loop uses local lookups instead of global and attribute ones
+    render = get_email_content
+    send = client.send_email
+    log_info = logger.info
+    log_error = logger.error
+    
+    def rendered_sends():
+        """Render each sendable email, counting emails that fail to render as failed"""
+        nonlocal failed_emails
+        for contact_id, contact, to_email, email_type, email_date_str, email_date in \
+                _iter_scheduled_sends(scheduled_data, contacts_by_id, start_date, end_date):
+            try:
+                content = render(email_type, contact, email_date)
+            except Exception as e:
+                log_error(f"Error rendering {email_type} email for contact {contact_id}: {e}")
+                failed_emails += 1
+                continue
+            yield contact_id, to_email, email_type, email_date_str, content
+    
+    # One flat stream of rendered emails; the limit is applied after rendering, so
+    # it counts emails handed to SendGrid and the schedule is only examined up to
+    # the last of them
+    work = rendered_sends()
+    if limit:
+        work = islice(work, limit)
+    
+    def collect_oldest():
+        """Wait for the oldest concurrent send and count its result"""
+        nonlocal successful_emails, failed_emails
+        email_type, contact_id, email_date_str, future = in_flight.popleft()
+        try:
+            result = future.result()
+        except Exception as e:
+            log_error(f"Error sending {email_type} email for contact {contact_id}: {e}")
+            failed_emails += 1
+            return
+        if result:
+            successful_emails += 1
+            log_info(f"Email {email_type} for contact {contact_id} scheduled on {email_date_str} sent successfully")
+        else:
+            failed_emails += 1
+            log_error(f"Failed to send {email_type} email for contact {contact_id} scheduled on {email_date_str}")
+    
+    # A dedicated pool, so the worker count really is `concurrency` rather than
+    # whatever a shared default executor allows
+    executor = ThreadPoolExecutor(max_workers=concurrency) if concurrency > 1 else None
+    
+    try:
+        for contact_id, to_email, email_type, email_date_str, content in work:
             try:
-                content = get_email_content(email_type, contact, email_date)
-                html_content = get_email_html_content(email_type, contact, email_date)
+                total_emails += 1
+                
+                if executor is not None:
+                    # Hand the email to the pool, first counting the oldest send if
+                    # enough rendered emails are already waiting on it
+                    if len(in_flight) >= max_in_flight:
+                        collect_oldest()
+                    in_flight.append((email_type, contact_id, email_date_str,
+                                      executor.submit(_paced_send, send, pacer, to_email, content, dry_run)))
+                    continue
                 
                 # Send the email
-                total_emails += 1
-                result = client.send_email(
-                    to_email=to_email,
-                    subject=content['subject'],
-                    content=content['body'],
-                    html_content=html_content,  # Already fixed by modifying get_email_html_content
-                    dry_run=dry_run
-                )
+                result = _paced_send(send, pacer, to_email, content, dry_run)
                 
                 if result:
                     successful_emails += 1
-                    logger.info(f"Email {email_type} for contact {contact_id} scheduled on {email_date_str} sent successfully")
+                    log_info(f"Email {email_type} for contact {contact_id} scheduled on {email_date_str} sent successfully")
                 else:
                     failed_emails += 1
-                    logger.error(f"Failed to send {email_type} email for contact {contact_id} scheduled on {email_date_str}")
-                
-                # Add a delay if specified (helps with rate limits)
-                if delay > 0 and total_emails < len(scheduled_data):
-                    time.sleep(delay)
-                
-                # Check if we've hit the limit
-                if limit and total_emails >= limit:
-                    logger.info(f"Reached email limit of {limit}, stopping")
-                    break
+                    log_error(f"Failed to send {email_type} email for contact {contact_id} scheduled on {email_date_str}")
                 
             except Exception as e:
-                logger.error(f"Error sending {email_type} email for contact {contact_id}: {e}")
+                log_error(f"Error sending {email_type} email for contact {contact_id}: {e}")
                 failed_emails += 1
         
         # Check if we've hit the limit
         if limit and total_emails >= limit:
-            break
+            logger.info(f"Reached email limit of {limit}, stopping")
+        
+        while in_flight:
+            collect_oldest()
+    finally:
+        # On an interrupted run, sends already started finish and queued ones are dropped
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
     
     # Log summary
     logger.info(f"Email sending complete: {successful_emails} successful, {failed_emails} failed, {total_emails} total")
@@ -175,7 +358,9 @@ def main():
     parser.add_argument("--start-date", help="Start date for emails (YYYY-MM-DD)")
     parser.add_argument("--end-date", help="End date for emails (YYYY-MM-DD)")
     parser.add_argument("--limit", type=int, help="Maximum number of emails to send")
-    parser.add_argument("--delay", type=float, default=0.0, help="Delay between emails in seconds")
+    parser.add_argument("--delay", type=float, default=0.0, help="Minimum interval in seconds between email sends, shared by all --concurrency workers")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="Maximum number of SendGrid requests in flight at once (default: 1)")
     parser.add_argument("--live", action="store_true", help="Send actual emails (default is dry-run)")
     
     args = parser.parse_args()
@@ -183,11 +368,11 @@ def main():
     # Parse dates if provided
     start_date = None
     if args.start_date:
-        start_date = datetime.strptime(args.start_date, "%Y-%m-%d").date()
+        start_date = parse_email_date(args.start_date)
     
     end_date = None
     if args.end_date:
-        end_date = datetime.strptime(args.end_date, "%Y-%m-%d").date()
+        end_date = parse_email_date(args.end_date)
     
     # Determine dry_run mode (default to True - dry run)
     dry_run = not args.live
@@ -206,7 +391,8 @@ def main():
         start_date=start_date,
         end_date=end_date,
         limit=args.limit,
-        delay=args.delay
+        delay=args.delay,
+        concurrency=args.concurrency
     )
     
     logger.info(f"Email sending complete: {result['successful']} successful, {result['failed']} failed, {result['total']} total")
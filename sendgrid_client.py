@@ -6,10 +6,18 @@ Includes batch sending capabilities for improved performance.
 
 import os
 import json
+import logging
+import random
+import re
 import time
+import threading
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import Dict, Any, Optional, Union, List, Tuple
 import sendgrid
-from sendgrid.helpers.mail import Mail, Email, To, Content, HtmlContent, Personalization
+from python_http_client.exceptions import HTTPError
+from sendgrid.helpers.mail import Email
 from email_scheduler_common import logger
 from dotenv_config import get_env, get_bool_env, get_email_config
 
@@ -18,10 +26,85 @@ DEFAULT_FROM_EMAIL = "medicare@example.com"
 DEFAULT_FROM_NAME = "Medicare Services" 
 DEFAULT_DRY_RUN = "true"
 MAX_BATCH_SIZE = 100  # SendGrid can handle up to 1000, but we'll be more conservative
+UNIQUE_SEND_WORKERS = 8  # Unique-content emails in flight at once
+
+# Retry policy for rate-limited (429) and server-error (5xx) responses
+SEND_MAX_ATTEMPTS = 5
+SEND_RETRY_BASE_DELAY = 0.5  # seconds; doubled on each attempt
+SEND_RETRY_MAX_DELAY = 30.0  # seconds
+
+@dataclass(slots=True, frozen=True)
+class EmailRequest:
+    """One email for the batch send methods; fields read as plain slot attributes"""
+    to_email: Optional[str]
+    subject: Optional[str] = None
+    content: Optional[str] = None
+    html_content: Optional[str] = None
+
+def _coerce_email_requests(emails: List[Union[EmailRequest, Dict[str, Any]]]) -> List[EmailRequest]:
+    """Accept EmailRequest objects or the email dictionaries the batch methods have always taken"""
+    return [
+        email if isinstance(email, EmailRequest) else EmailRequest(
+            email.get('to_email'), email.get('subject'), email.get('content'), email.get('html_content')
+        )
+        for email in emails
+    ]
+
+# Compiled once rather than per recipient
+_EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+# Batches, retries and re-runs keep sending to the same addresses, so the verdict
+# is memoized per address
+EMAIL_VALIDATION_CACHE_SIZE = 8192
+
+@lru_cache(maxsize=EMAIL_VALIDATION_CACHE_SIZE)
+def _valid_email(addr: Optional[str]) -> bool:
+    """Whether addr looks like a deliverable address (local@domain.tld, no spaces)"""
+    return bool(addr) and _EMAIL_RE.match(addr) is not None
+
+def reset_validation_cache() -> None:
+    """Forget memoized address validation results"""
+    _valid_email.cache_clear()
+
+# Email settings come from the environment, which is loaded once at startup, so they
+# are read once per process; call reset_email_config_cache() after changing them
+_email_config = lru_cache(maxsize=1)(get_email_config)
+
+def reset_email_config_cache() -> None:
+    """
+    Forget the memoized email settings, so clients created afterwards read the
+    current environment. Shared clients are keyed by their settings, so the
+    convenience functions pick up new settings with a new client.
+    """
+    _email_config.cache_clear()
+
+# Error bodies are only read on failure, and at most this much of one is kept as raw text
+ERROR_BODY_PREVIEW_BYTES = 512
+
+def _response_error_details(response: Any) -> str:
+    """
+    Error details for a failed SendGrid response: the API's error messages when the
+    body is its JSON error format, otherwise the start of the raw body
+    """
+    body = getattr(response, 'body', None)
+    if not body:
+        return "No response body"
+    # Try to parse JSON for more detailed error
+    try:
+        error_json = json.loads(body)
+        if isinstance(error_json, dict) and 'errors' in error_json:
+            return '; '.join([e.get('message', str(e)) for e in error_json['errors']])
+    except (ValueError, TypeError, AttributeError):
+        pass
+    if isinstance(body, str):
+        return body[:ERROR_BODY_PREVIEW_BYTES]
+    return body[:ERROR_BODY_PREVIEW_BYTES].decode('utf-8', errors='replace')
 
 class SendGridClient:
     """Client for interacting with SendGrid API to send emails, with batch capabilities."""
     
+    __slots__ = ('api_key', 'dry_run', 'from_email', 'from_name', '_from_payload', '_client', '_client_ready', '_client_lock')
+    
     def __init__(self, api_key: Optional[str] = None, dry_run: Optional[bool] = None):
         """
         Initialize the SendGrid client with API key and settings.
@@ -31,7 +114,7 @@ class SendGridClient:
             dry_run: Whether to operate in dry-run mode (if None, reads from EMAIL_DRY_RUN env var)
         """
         # Get email configuration from environment
-        email_config = get_email_config()
+        email_config = _email_config()
         
         # Use provided API key or read from environment
         self.api_key = api_key or email_config["api_key"]
@@ -46,13 +129,135 @@ class SendGridClient:
         self.from_email = email_config["from_email"]
         self.from_name = email_config["from_name"]
         
-        # Initialize SendGrid client if API key is available and not in dry-run mode
-        self.client = None
-        if not self.dry_run and self.api_key:
+        # The sender never changes between sends, so its JSON form for the
+        # hand-built request bodies is built once
+        self._from_payload = Email(self.from_email, self.from_name).get()
+        
+        # A SendGrid API client is needed only with an API key outside dry-run mode,
+        # and is built when a live send first uses it. The lock keeps threads sharing
+        # this client from seeing it marked ready before it has been assigned
+        self._client = None
+        self._client_ready = self.dry_run or not self.api_key
+        self._client_lock = threading.Lock()
+    
+    @property
+    def client(self):
+        """SendGridAPIClient, created on first use; None in dry-run mode or without an API key"""
+        if not self._client_ready:
+            with self._client_lock:
+                if not self._client_ready:
+                    try:
+                        self._client = sendgrid.SendGridAPIClient(api_key=self.api_key)
+                    except Exception as e:
+                        logger.error(f"Failed to initialize SendGrid client: {e}")
+                    self._client_ready = True
+        return self._client
+    
+    @client.setter
+    def client(self, value):
+        with self._client_lock:
+            self._client = value
+            self._client_ready = True
+    
+    @staticmethod
+    def _is_retryable_status(status_code: int) -> bool:
+        """Whether a send that got this status is worth retrying"""
+        return status_code == 429 or 500 <= status_code < 600
+    
+    @staticmethod
+    def _retry_delay(attempt: int, headers: Any, base: float, cap: float) -> float:
+        """
+        Seconds to wait before retry number attempt + 1. When SendGrid says when quota
+        returns (Retry-After in seconds, or the X-RateLimit-Reset epoch time), wait at
+        least until then plus up to 25% jitter, so the first retry lands after the
+        reset instead of probing the limiter. Otherwise use capped exponential backoff
+        with full jitter so concurrent senders do not retry in lockstep.
+        """
+        backoff = base * (2 ** attempt)
+        
+        advertised = []
+        if headers:
+            for header in ('Retry-After', 'X-RateLimit-Reset'):
+                value = headers.get(header)
+                if not value:
+                    continue
+                try:
+                    seconds = float(value)
+                except (TypeError, ValueError):
+                    continue
+                if header == 'X-RateLimit-Reset':
+                    seconds -= time.time()
+                advertised.append((seconds, header))
+        
+        if advertised:
+            seconds, source = max(advertised)
+            wait = min(cap, max(seconds, backoff))
+            wait = min(cap, wait + random.uniform(0, 0.25 * wait))
+        else:
+            source = 'exponential backoff'
+            wait = random.uniform(0, min(cap, backoff))
+        
+        logger.debug("Waiting %.2fs before SendGrid retry (from %s)", wait, source)
+        return wait
+    
+    def _post_with_retry(
+        self,
+        request_body: Any,
+        max_attempts: int = SEND_MAX_ATTEMPTS,
+        base: float = SEND_RETRY_BASE_DELAY,
+        cap: float = SEND_RETRY_MAX_DELAY
+    ):
+        """
+        POST a mail send request, retrying 429 and 5xx responses with backoff.
+        
+        The SDK raises HTTPError for error statuses; both that and a returned error
+        response are retried. After the last attempt the response is returned, or
+        the HTTPError re-raised, exactly as a single unretried call would.
+        """
+        for attempt in range(max_attempts):
+            last_attempt = attempt == max_attempts - 1
             try:
-                self.client = sendgrid.SendGridAPIClient(api_key=self.api_key)
-            except Exception as e:
-                logger.error(f"Failed to initialize SendGrid client: {e}")
+                response = self.client.client.mail.send.post(request_body=request_body)
+            except HTTPError as e:
+                if last_attempt or not self._is_retryable_status(e.status_code):
+                    raise
+                status_code, headers = e.status_code, e.headers
+            else:
+                if last_attempt or not self._is_retryable_status(response.status_code):
+                    return response
+                status_code, headers = response.status_code, getattr(response, 'headers', None)
+            
+            delay = self._retry_delay(attempt, headers, base, cap)
+            logger.warning(f"SendGrid returned status {status_code}, retrying in {delay:.2f}s "
+                           f"(attempt {attempt + 2} of {max_attempts})")
+            time.sleep(delay)
+    
+    def _build_mail_json(
+        self,
+        to_email: str,
+        subject: Optional[str],
+        content: str,
+        html_content: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Build the request body Mail(...).get() would produce for a single-recipient
+        email directly, skipping the SDK helper objects. HTML content is used if
+        provided, otherwise plain text.
+        """
+        if html_content:
+            content_payload = {"type": "text/html", "value": html_content}
+        else:
+            content_payload = {"type": "text/plain", "value": content}
+        
+        payload = {
+            "from": self._from_payload,
+            "personalizations": [{"to": [{"email": to_email}]}],
+            "content": [content_payload]
+        }
+        # Mail leaves the subject out when there is none
+        if subject is not None:
+            payload["subject"] = subject
+        return payload
     
     def send_email(
         self, 
@@ -79,13 +284,15 @@ class SendGridClient:
         use_dry_run = self.dry_run if dry_run is None else dry_run
         
         # Validate email address format (basic check)
-        if not to_email or '@' not in to_email:
-            logger.error(f"Invalid email address: {to_email}")
+        if not _valid_email(to_email):
+            logger.error("Invalid email address: %s", to_email)
             return False
         
-        # In dry-run mode, just log the email (with less detail)
+        # In dry-run mode, just log the email (with less detail). send_email runs once
+        # per recipient, so its log calls pass arguments instead of f-strings and
+        # formatting is skipped when the level is filtered out
         if use_dry_run:
-            logger.info(f"[DRY RUN] Would send email to: {to_email} - Subject: {subject}")
+            logger.info("[DRY RUN] Would send email to: %s - Subject: %s", to_email, subject)
             return True
         
         # Ensure we have API key for live mode
@@ -99,21 +306,10 @@ class SendGridClient:
             return False
         
         try:
-            # Create email message
-            from_email = Email(self.from_email, self.from_name)
-            to_email_obj = To(to_email)
-            
-            # Use HTML content if provided, otherwise use plain text
-            if html_content:
-                content_obj = HtmlContent(html_content)
-            else:
-                content_obj = Content("text/plain", content)
-            
-            # Construct the message
-            message = Mail(from_email, to_email_obj, subject, content_obj)
+            payload = self._build_mail_json(to_email, subject, content, html_content)
             
             # Send the email
-            response = self.client.send(message)
+            response = self._post_with_retry(payload)
             
             # Check response
             status_code = response.status_code
@@ -132,46 +328,42 @@ class SendGridClient:
                         if isinstance(response_json, dict) and 'message_id' in response_json:
                             message_id = response_json['message_id']
                 except Exception as parse_err:
-                    logger.warning(f"Could not extract message ID from response: {str(parse_err)}")
+                    logger.warning("Could not extract message ID from response: %s", parse_err)
                 
-                logger.info(f"Email accepted by SendGrid for {to_email}, status: {status_code}, message_id: {message_id}")
+                logger.info("Email accepted by SendGrid for %s, status: %s, message_id: %s",
+                            to_email, status_code, message_id)
                 # Return both success and the message ID
                 return {"success": True, "status": "accepted", "message_id": message_id}
             else:
                 # Try to get more details from the response
-                error_details = "No response body"
-                try:
-                    if hasattr(response, 'body') and response.body:
-                        response_body = response.body.decode('utf-8')
-                        error_details = response_body
-                        # Try to parse JSON for more detailed error
-                        try:
-                            error_json = json.loads(response_body)
-                            if isinstance(error_json, dict) and 'errors' in error_json:
-                                error_details = '; '.join([e.get('message', str(e)) for e in error_json['errors']])
-                        except:
-                            pass
-                except Exception as decode_err:
-                    error_details = f"Could not decode response: {str(decode_err)}"
+                error_details = _response_error_details(response)
                 
-                logger.error(f"Failed to send email to {to_email}, status: {status_code}, details: {error_details}")
+                logger.error("Failed to send email to %s, status: %s, details: %s",
+                             to_email, status_code, error_details)
                 return {"success": False, "status": "api_error", "error": error_details}
             
+        except HTTPError as e:
+            # The SDK raises for 4xx/5xx statuses; report them like an error response
+            # rather than embedding the whole body in the exception text
+            error_details = _response_error_details(e)
+            logger.error("Failed to send email to %s, status: %s, details: %s",
+                         to_email, e.status_code, error_details)
+            return {"success": False, "status": "api_error", "error": error_details}
         except Exception as e:
             error_message = str(e)
-            logger.error(f"Error sending email to {to_email}: {error_message}")
+            logger.error("Error sending email to %s: %s", to_email, error_message)
             return {"success": False, "status": "exception", "error": error_message}
 
     def send_batch(
         self, 
-        emails: List[Dict[str, Any]],
+        emails: List[Union[EmailRequest, Dict[str, Any]]],
         dry_run: Optional[bool] = None
     ) -> Tuple[int, int, List[str]]:
         """
         Send a batch of emails using SendGrid's batch API capability.
         
         Args:
-            emails: List of email dictionaries, each containing:
+            emails: List of EmailRequest objects, or email dictionaries containing:
                 - to_email: Recipient email address
                 - subject: Email subject
                 - content: Plain text content
@@ -179,7 +371,8 @@ class SendGridClient:
             dry_run: Override instance dry_run setting for this batch
             
         Returns:
-            Tuple of (success_count, failed_count, error_messages)
+            Tuple of (success_count, failed_count, error_messages). Duplicate recipients
+            are logged and left out of both counts, since no email is sent for them
         """
         # Determine dry run mode for this batch
         use_dry_run = self.dry_run if dry_run is None else dry_run
@@ -194,19 +387,44 @@ class SendGridClient:
             logger.warning("Empty email batch provided, nothing to send")
             return success_count, failed_count, errors
         
+        emails = _coerce_email_requests(emails)
+        
+        # In dry-run mode, just log one summary line per sub-batch (with less verbosity)
+        # without slicing the batch
+        if use_dry_run:
+            total = len(emails)
+            for i in range(0, total, MAX_BATCH_SIZE):
+                logger.info("[DRY RUN] Would send %d emails in batch", min(MAX_BATCH_SIZE, total - i))
+            if logger.isEnabledFor(logging.DEBUG):
+                for email in emails:
+                    logger.debug("[DRY RUN] Would send email to: %s - Subject: %s",
+                                 email.to_email, email.subject)
+            
+            # Duplicate recipients are skipped as in a live send; every other
+            # dry-run email is considered successful
+            seen_recipients = set()
+            duplicate_count = 0
+            for email in emails:
+                if not _valid_email(email.to_email):
+                    continue
+                recipient_key = email.to_email.lower()
+                if recipient_key in seen_recipients:
+                    duplicate_count += 1
+                else:
+                    seen_recipients.add(recipient_key)
+            if duplicate_count:
+                logger.info(f"[DRY RUN] Would skip {duplicate_count} duplicate recipients; not counted as sent or failed")
+            return total - duplicate_count, 0, []
+        
+        # Addresses (lowercased) already given a personalization in this batch; a
+        # duplicate row would use another recipient slot for a copy of the same email
+        seen_recipients = set()
+        duplicate_count = 0
+        
         # Process in sub-batches to stay within API limits
         for i in range(0, len(emails), MAX_BATCH_SIZE):
             sub_batch = emails[i:i+MAX_BATCH_SIZE]
             
-            # In dry-run mode, just log the emails (with less verbosity)
-            if use_dry_run:
-                email_count = len(sub_batch)
-                logger.info(f"[DRY RUN] Would send {email_count} emails in batch")
-                
-                # All dry-run emails are considered successful
-                success_count += len(sub_batch)
-                continue
-            
             # Ensure we have API key for live mode
             if not self.api_key:
                 error_msg = "Cannot send batch: SendGrid API key not provided"
@@ -224,66 +442,91 @@ class SendGridClient:
                 continue
             
             try:
-                # Prepare the batch request using personalizations
-                from_email = Email(self.from_email, self.from_name)
-                
-                # For v3 Mail Send API with personalizations
-                mail = Mail()
-                mail.from_email = from_email
+                # For v3 Mail Send API with personalizations. The request body is built
+                # as plain dicts: Mail.add_personalization inserts each one at the front
+                # of its list, which is quadratic over a sub-batch
+                personalizations = []
                 
                 # Create a separate personalization for each recipient
+                dedup_skipped = 0
                 for email in sub_batch:
-                    to_email = email.get('to_email')
-                    subject = email.get('subject')
+                    to_email = email.to_email
+                    subject = email.subject
                     
                     # Skip invalid emails
-                    if not to_email or '@' not in to_email:
+                    if not _valid_email(to_email):
                         logger.error(f"Invalid email address: {to_email}")
                         failed_count += 1
                         errors.append(f"Invalid email address: {to_email}")
                         continue
                     
-                    # Add personalization
-                    personalization = Personalization()
-                    personalization.add_to(To(to_email))
-                    personalization.subject = subject
-                    mail.add_personalization(personalization)
+                    # Skip recipients already addressed in this batch
+                    recipient_key = to_email.lower()
+                    if recipient_key in seen_recipients:
+                        dedup_skipped += 1
+                        continue
+                    seen_recipients.add(recipient_key)
+                    
+                    # Add personalization; like Personalization.get(), an empty subject is left out
+                    personalization = {"to": [{"email": to_email}]}
+                    if subject:
+                        personalization["subject"] = subject
+                    personalizations.append(personalization)
+                
+                if dedup_skipped:
+                    logger.info(f"Skipped {dedup_skipped} duplicate recipients in batch")
+                    duplicate_count += dedup_skipped
+                
+                # Every row was invalid or a duplicate; SendGrid rejects an empty
+                # personalizations list, so there is nothing to post
+                if not personalizations:
+                    continue
                 
                 # Set content - using the first email's content as default
-                if sub_batch and sub_batch[0].get('html_content'):
-                    mail.add_content(HtmlContent(sub_batch[0].get('html_content')))
-                elif sub_batch and sub_batch[0].get('content'):
-                    mail.add_content(Content("text/plain", sub_batch[0].get('content')))
+                if sub_batch and sub_batch[0].html_content:
+                    content_payload = {"type": "text/html", "value": sub_batch[0].html_content}
+                elif sub_batch and sub_batch[0].content:
+                    content_payload = {"type": "text/plain", "value": sub_batch[0].content}
                 else:
-                    mail.add_content(Content("text/plain", "Email content not provided"))
+                    content_payload = {"type": "text/plain", "value": "Email content not provided"}
+                
+                payload = {
+                    "from": self._from_payload,
+                    "personalizations": personalizations,
+                    "content": [content_payload]
+                }
                 
                 # Send the batch of emails
                 start_time = time.time()
-                response = self.client.send(mail)
+                response = self._post_with_retry(payload)
                 end_time = time.time()
                 
                 # Check response
                 status_code = response.status_code
                 
+                # Only rows that made it into the request count as sent or failed below;
+                # invalid addresses were already counted as failures above
+                batch_size = len(personalizations)
                 if 200 <= status_code < 300:  # Success status codes
-                    batch_size = len(sub_batch)
                     duration = end_time - start_time
                     logger.info(f"Batch of {batch_size} emails sent successfully in {duration:.2f}s, status: {status_code}")
                     success_count += batch_size
                 else:
-                    batch_size = len(sub_batch)
                     error_msg = f"Failed to send batch of {batch_size} emails, status: {status_code}"
                     logger.error(error_msg)
                     errors.append(error_msg)
                     failed_count += batch_size
             
             except Exception as e:
-                batch_size = len(sub_batch)
+                batch_size = len(personalizations)
                 error_msg = f"Error sending batch of {batch_size} emails: {str(e)}"
                 logger.error(error_msg)
                 errors.append(error_msg)
                 failed_count += batch_size
         
+        if duplicate_count:
+            logger.info(f"Skipped {duplicate_count} duplicate recipients in total; not counted as sent or failed")
+        
         return success_count, failed_count, errors
     
     def query_message_status(self, message_id: str) -> Dict[str, Any]:
@@ -357,20 +600,7 @@ class SendGridClient:
                 }
             else:
                 # Try to get error details
-                error_details = "No response body"
-                try:
-                    if hasattr(response, 'body') and response.body:
-                        response_body = response.body.decode('utf-8')
-                        error_details = response_body
-                        # Try to parse JSON for more detailed error
-                        try:
-                            error_json = json.loads(response_body)
-                            if isinstance(error_json, dict) and 'errors' in error_json:
-                                error_details = '; '.join([e.get('message', str(e)) for e in error_json['errors']])
-                        except:
-                            pass
-                except Exception as decode_err:
-                    error_details = f"Could not decode response: {str(decode_err)}"
+                error_details = _response_error_details(response)
                 
                 # Check for common errors
                 if status_code == 404:
@@ -400,9 +630,51 @@ class SendGridClient:
                 "error": error_message
             }
     
+    def _post_mail_item(self, mail_dict: Dict[str, Any]) -> Optional[str]:
+        """
+        POST one unique-content mail.
+        
+        Returns:
+            None on success, otherwise the error message
+        """
+        to_email = mail_dict["personalizations"][0]["to"][0]["email"]
+        try:
+            response = self._post_with_retry(mail_dict)
+            
+            # Check response
+            status_code = response.status_code
+            if 200 <= status_code < 300:  # Success status codes
+                return None
+            error_msg = f"Failed to send unique email to {to_email}, status: {status_code}"
+        except HTTPError as e:
+            error_msg = (f"Failed to send unique email to {to_email}, status: {e.status_code}, "
+                         f"details: {_response_error_details(e)}")
+        except Exception as e:
+            error_msg = f"Error sending unique email to {to_email}: {str(e)}"
+        
+        logger.error(error_msg)
+        return error_msg
+    
+    def _build_mail_item(self, email: EmailRequest) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Build the request body for one unique-content email.
+        
+        Returns:
+            Tuple of (mail dict, None), or (None, error message) for an invalid address
+        """
+        to_email = email.to_email
+        
+        # Skip invalid emails
+        if not _valid_email(to_email):
+            logger.error(f"Invalid email address: {to_email}")
+            return None, f"Invalid email address: {to_email}"
+        
+        content = email.content or "Email content not provided"
+        return self._build_mail_json(to_email, email.subject, content, email.html_content), None
+    
     def send_batch_with_unique_content(
         self, 
-        emails: List[Dict[str, Any]],
+        emails: List[Union[EmailRequest, Dict[str, Any]]],
         dry_run: Optional[bool] = None
     ) -> Tuple[int, int, List[str]]:
         """
@@ -411,7 +683,7 @@ class SendGridClient:
         This is less efficient but allows for completely different content per recipient.
         
         Args:
-            emails: List of email dictionaries, each containing:
+            emails: List of EmailRequest objects, or email dictionaries containing:
                 - to_email: Recipient email address
                 - subject: Email subject
                 - content: Plain text content
@@ -419,7 +691,9 @@ class SendGridClient:
             dry_run: Override instance dry_run setting for this batch
             
         Returns:
-            Tuple of (success_count, failed_count, error_messages)
+            Tuple of (success_count, failed_count, error_messages). Exact repeats of an
+            email are logged as duplicates and left out of both counts, since only the
+            first copy is sent
         """
         # Determine dry run mode for this batch
         use_dry_run = self.dry_run if dry_run is None else dry_run
@@ -431,8 +705,11 @@ class SendGridClient:
         
         # In dry-run mode, just log the emails (with less verbosity)
         if use_dry_run:
-            email_count = len(emails)
-            logger.info(f"[DRY RUN] Would send {email_count} unique emails")
+            logger.info("[DRY RUN] Would send %d unique emails", len(emails))
+            if logger.isEnabledFor(logging.DEBUG):
+                for email in _coerce_email_requests(emails):
+                    logger.debug("[DRY RUN] Would send email to: %s - Subject: %s",
+                                 email.to_email, email.subject)
             
             # All dry-run emails are considered successful
             return len(emails), 0, []
@@ -449,76 +726,75 @@ class SendGridClient:
             logger.error(error_msg)
             return 0, len(emails), [error_msg]
         
-        # Process each email individually (but in a batch request)
-        mail_items = []
+        # Build each email's request body; invalid addresses come back as errors
+        # instead of mail items
+        built = [self._build_mail_item(email) for email in _coerce_email_requests(emails)]
+        invalid_errors = [error for _, error in built if error]
+        failed_count += len(invalid_errors)
+        errors.extend(invalid_errors)
         
-        # Prepare each email
-        for email in emails:
-            to_email = email.get('to_email')
-            subject = email.get('subject')
-            
-            # Skip invalid emails
-            if not to_email or '@' not in to_email:
-                logger.error(f"Invalid email address: {to_email}")
-                failed_count += 1
-                errors.append(f"Invalid email address: {to_email}")
+        # Drop exact repeats (same recipient, subject and content); distinct messages
+        # to one address are kept. A dropped repeat is neither sent nor failed
+        mail_items = []
+        seen_messages = set()
+        for mail_dict, _ in built:
+            if mail_dict is None:
                 continue
-            
-            # Create individual mail
-            from_email = Email(self.from_email, self.from_name)
-            to_email_obj = To(to_email)
-            
-            # Prepare email content
-            if email.get('html_content'):
-                content = HtmlContent(email.get('html_content'))
-            elif email.get('content'):
-                content = Content("text/plain", email.get('content'))
-            else:
-                content = Content("text/plain", "Email content not provided")
-            
-            # Create mail object
-            mail = Mail(from_email, to_email_obj, subject, content)
-            
-            # Prepare for the API
-            mail_dict = mail.get()
+            message_key = (
+                mail_dict["personalizations"][0]["to"][0]["email"].lower(),
+                mail_dict.get("subject"),
+                mail_dict["content"][0]["value"]
+            )
+            if message_key in seen_messages:
+                continue
+            seen_messages.add(message_key)
             mail_items.append(mail_dict)
         
-        # Process in sub-batches to stay within API limits
-        for i in range(0, len(mail_items), MAX_BATCH_SIZE):
-            sub_batch = mail_items[i:i+MAX_BATCH_SIZE]
-            
-            try:
-                start_time = time.time()
-                
-                # SendGrid v3 API batch send
-                response = self.client.client.mail.send.post(request_body=sub_batch)
-                
-                end_time = time.time()
-                
-                # Check response
-                status_code = response.status_code
-                
-                if 200 <= status_code < 300:  # Success status codes
-                    batch_size = len(sub_batch)
-                    duration = end_time - start_time
-                    logger.info(f"Batch of {batch_size} unique emails sent successfully in {duration:.2f}s, status: {status_code}")
-                    success_count += batch_size
-                else:
-                    batch_size = len(sub_batch)
-                    error_msg = f"Failed to send batch of {batch_size} unique emails, status: {status_code}"
-                    logger.error(error_msg)
-                    errors.append(error_msg)
-                    failed_count += batch_size
-            
-            except Exception as e:
-                batch_size = len(sub_batch)
-                error_msg = f"Error sending batch of {batch_size} unique emails: {str(e)}"
-                logger.error(error_msg)
-                errors.append(error_msg)
-                failed_count += batch_size
+        duplicate_count = len(built) - len(invalid_errors) - len(mail_items)
+        if duplicate_count:
+            logger.info(f"Skipped {duplicate_count} duplicate unique-content emails; not counted as sent or failed")
+        
+        # The mail send endpoint takes one message per request, so every email is its
+        # own POST. Each one waits on the network, so they go out from a small thread pool
+        start_time = time.time()
+        if len(mail_items) > 1:
+            with ThreadPoolExecutor(max_workers=min(UNIQUE_SEND_WORKERS, len(mail_items))) as pool:
+                results = list(pool.map(self._post_mail_item, mail_items))
+        else:
+            results = [self._post_mail_item(mail_dict) for mail_dict in mail_items]
+        
+        # Results are in input order, so errors are reported in a stable order
+        send_errors = [error for error in results if error]
+        success_count += len(mail_items) - len(send_errors)
+        failed_count += len(send_errors)
+        errors.extend(send_errors)
+        
+        if mail_items:
+            duration = time.time() - start_time
+            logger.info(f"Sent {len(mail_items) - len(send_errors)} of {len(mail_items)} unique emails in {duration:.2f}s")
         
         return success_count, failed_count, errors
 
+# Clients shared by the convenience functions, keyed by the settings they were built
+# with, so repeated calls reuse one SendGridAPIClient instead of building a new one
+_CLIENT_CACHE: Dict[Tuple[Any, ...], SendGridClient] = {}
+_CLIENT_CACHE_LOCK = threading.Lock()
+
+def _get_client(api_key: Optional[str] = None, dry_run: Optional[bool] = None) -> SendGridClient:
+    """Return the shared SendGridClient for these settings, creating it on first use"""
+    email_config = _email_config()
+    key = (
+        api_key or email_config["api_key"],
+        email_config["dry_run"] if dry_run is None else dry_run,
+        email_config["from_email"],
+        email_config["from_name"],
+    )
+    with _CLIENT_CACHE_LOCK:
+        client = _CLIENT_CACHE.get(key)
+        if client is None:
+            client = _CLIENT_CACHE[key] = SendGridClient(api_key=api_key, dry_run=dry_run)
+    return client
+
 # Convenience functions for standalone use
 def send_email(
     to_email: str, 
@@ -540,24 +816,24 @@ def send_email(
     Returns:
         Boolean indicating success
     """
-    client = SendGridClient(dry_run=dry_run)
+    client = _get_client(dry_run=dry_run)
     return client.send_email(to_email, subject, content, html_content, dry_run)
 
 def send_batch(
-    emails: List[Dict[str, Any]],
+    emails: List[Union[EmailRequest, Dict[str, Any]]],
     dry_run: Optional[bool] = None
 ) -> Tuple[int, int, List[str]]:
     """
     Convenience function to send a batch of emails without managing client instance.
     
     Args:
-        emails: List of email dictionaries
+        emails: List of EmailRequest objects or email dictionaries
         dry_run: Whether to operate in dry-run mode
         
     Returns:
         Tuple of (success_count, failed_count, error_messages)
     """
-    client = SendGridClient(dry_run=dry_run)
+    client = _get_client(dry_run=dry_run)
     return client.send_batch(emails, dry_run)
 
 def query_email_status(
@@ -574,5 +850,5 @@ def query_email_status(
     Returns:
         Dictionary with email status information
     """
-    client = SendGridClient(api_key=api_key)
+    client = _get_client(api_key=api_key)
     return client.query_message_status(message_id)
\ No newline at end of file
@@ -69,6 +69,8 @@ def main():
     parser.add_argument("--display", "-d", type=int, default=5,
                        help="Number of results to display (default: 5)")
     parser.add_argument("--use-async", action="store_true", help="Use async processing")
+    parser.add_argument("--workers", type=int, default=None,
+                       help="Worker processes for async processing (default: schedule in-process)")
     parser.add_argument("--debug", action="store_true", help="Enable debug logging")
     parser.add_argument("--verbose", action="store_true", help="Enable verbose logging")
     
@@ -118,7 +120,8 @@ def main():
         if args.use_async:
             import asyncio
             logger.info("Processing contacts asynchronously...")
-            results = asyncio.run(main_async(sampled_contacts, current_date, end_date))
+            results = asyncio.run(main_async(sampled_contacts, current_date, end_date,
+                                              max_workers=args.workers))
         else:
             logger.info("Processing contacts synchronously...")
             results = main_sync(sampled_contacts, current_date, end_date)
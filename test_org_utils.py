@@ -0,0 +1,75 @@
+"""
+Tests for writing scheduler results into an organization database.
+"""
+
+import os
+import sqlite3
+import tempfile
+import unittest
+from datetime import date
+
+from org_utils import write_scheduled_emails_to_db
+
+MIGRATION_PATH = os.path.join(os.path.dirname(__file__), "migrations", "add_scheduled_emails.sql")
+
+
+class WriteScheduledEmailsToDbTest(unittest.TestCase):
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        conn = sqlite3.connect(self.db_path)
+        try:
+            with open(MIGRATION_PATH) as f:
+                conn.executescript(f.read())
+        finally:
+            conn.close()
+
+    def tearDown(self):
+        os.remove(self.db_path)
+
+    def read_rows(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return conn.execute(
+                "SELECT organization_id, contact_id, email_type, scheduled_at, status "
+                "FROM scheduled_emails ORDER BY id"
+            ).fetchall()
+        finally:
+            conn.close()
+
+    def test_rows_are_written_and_read_back(self):
+        results = [
+            {"contact_id": 1, "scheduled": [
+                {"type": "birthday", "date": date(2025, 3, 1)},
+                {"type": "aep", "date": "2025-09-15"},
+            ], "skipped": []},
+            {"contact_id": 2, "scheduled": [], "skipped": []},
+            {"contact_id": 3, "scheduled": [
+                {"type": "effective_date", "date": date(2025, 6, 1)},
+            ], "skipped": []},
+        ]
+
+        inserted = write_scheduled_emails_to_db(self.db_path, 37, results)
+
+        self.assertEqual(inserted, 3)
+        self.assertEqual(self.read_rows(), [
+            (37, 1, "birthday", "2025-03-01", "pending"),
+            (37, 1, "aep", "2025-09-15", "pending"),
+            (37, 3, "effective_date", "2025-06-01", "pending"),
+        ])
+
+    def test_failure_writes_nothing(self):
+        results = [
+            {"contact_id": 1, "scheduled": [{"type": "birthday", "date": date(2025, 3, 1)}]},
+            # A NULL type violates the NOT NULL constraint partway through the insert
+            {"contact_id": 2, "scheduled": [{"type": None, "date": date(2025, 3, 2)}]},
+        ]
+
+        with self.assertRaises(sqlite3.IntegrityError):
+            write_scheduled_emails_to_db(self.db_path, 37, results)
+
+        self.assertEqual(self.read_rows(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
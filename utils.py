@@ -1,3 +1,43 @@
+import hashlib
+from functools import lru_cache
+from typing import Any
+
+from dotenv_config import get_app_config
+
+# Link settings come from the environment, which dotenv_config has already loaded
+# and which does not change for the life of the process; read them once
+_APP_CONFIG = get_app_config()
+_QUOTE_SECRET = _APP_CONFIG["quote_secret"]
+# The quote hash must stay SHA-256 to match the TypeScript implementation; the
+# "-<secret>" tail of the hashed string is encoded once here instead of per contact
+_QUOTE_SECRET_SUFFIX = f"-{_QUOTE_SECRET}".encode('utf-8')
+_COMPARE_URL_PREFIX = f"{_APP_CONFIG['base_url'].rstrip('/')}/compare?id="
+
+# Quote IDs depend only on (org_id, contact_id), and a contact's emails are linked
+# one after another, so a bounded cache absorbs the repeat hashing
+QUOTE_ID_CACHE_SIZE = 65536
+
+
+@lru_cache(maxsize=None)
+def _quote_hash_prefix(org_id_str: str) -> Any:
+    """SHA-256 state with the constant "<org_id>-" prefix already absorbed; copy before use"""
+    return hashlib.sha256(f"{org_id_str}-".encode('utf-8'))
+
+@lru_cache(maxsize=QUOTE_ID_CACHE_SIZE)
+def _quote_id(org_id: int, contact_id_int: int) -> str:
+    """Build the "<org_id>-<contact_id>-<hash>" quote ID for a contact"""
+    # Hash "<org_id>-<contact_id>-<secret>" - EXACTLY matching TypeScript implementation.
+    # Convert numbers to strings first to ensure exact string concatenation; the org
+    # prefix is absorbed once per org and the hasher copied per contact
+    hasher = _quote_hash_prefix(str(org_id)).copy()
+    
+    # Encode as UTF-8 to match Node.js behavior
+    hasher.update(str(contact_id_int).encode('utf-8'))
+    hasher.update(_QUOTE_SECRET_SUFFIX)
+    hash_value = hasher.hexdigest()[:8]
+    
+    # Combine components into quote ID
+    return f"{org_id}-{contact_id_int}-{hash_value}"
 
 def generate_link(org_id: int, contact_id: str, email_type: str, email_date: str) -> str:
     """
@@ -12,32 +52,9 @@ def generate_link(org_id: int, contact_id: str, email_type: str, email_date: str
     Returns:
         Generated URL for tracking
     """
-    import hashlib
-    from dotenv_config import get_app_config
-
-    # Convert contact_id to int for quote ID generation
-    contact_id_int = int(contact_id)
-    
-    # Get application configuration from environment
-    app_config = get_app_config()
-    quote_secret = app_config["quote_secret"]
-    base_url = app_config["base_url"]
-    
-    # Create data string to hash - EXACTLY matching TypeScript implementation
-    # Convert numbers to strings first to ensure exact string concatenation
-    org_id_str = str(org_id)
-    contact_id_str = str(contact_id_int)
-    data_to_hash = f"{org_id_str}-{contact_id_str}-{quote_secret}"
-    
-    # Generate hash using hashlib - encode as UTF-8 to match Node.js behavior
-    hash_value = hashlib.sha256(data_to_hash.encode('utf-8')).hexdigest()[:8]
-    
-    # Combine components into quote ID
-    quote_id = f"{org_id}-{contact_id_int}-{hash_value}"
-    
-    # Ensure quote ID is properly URL encoded
-    from urllib.parse import quote
-    quote_id_enc = quote(quote_id)
+    # Convert contact_id to int for quote ID generation; callers in a loop pass it pre-converted
+    contact_id_int = contact_id if isinstance(contact_id, int) else int(contact_id)
     
-    # Construct tracking URL with quote ID
-    return f"{base_url.rstrip('/')}/compare?id={quote_id_enc}"
\ No newline at end of file
+    # Construct tracking URL with quote ID. It is made only of integer IDs, '-' and
+    # hex digits, none of which need URL encoding
+    return f"{_COMPARE_URL_PREFIX}{_quote_id(org_id, contact_id_int)}"
\ No newline at end of file